@@ -1,14 +1,26 @@
+import time
+
+start = time.perf_counter()
+
 import os
 import re
+import sys
 import json
 import logging
 from dotenv import load_dotenv
 load_dotenv()
 
-from sagemaker.predictor import retrieve_default
+# The lightweight SageMaker predictor lives next to the Agentic scripts.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Agentic"))
+from micro_batch import batching_predictor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 endpoint_name = "jumpstart-dft-deepseek-llm-r1-disti-20250408-101531"
-predictor = retrieve_default(endpoint_name)
+# The three independent prompts below go to the endpoint together (one batched call).
+predictor = batching_predictor(endpoint_name)
+logger.info("Predictor ready in %.0f ms", (time.perf_counter() - start) * 1000)
 payload = {
     "messages": [
         {
@@ -18,8 +30,7 @@ payload = {
     ],
     "max_tokens": 128
 }
-response = predictor.predict(payload)
-print(response)
+payloads = [payload]
 
 payload = {
     "messages": [
@@ -38,8 +49,7 @@ payload = {
     ],
     "max_tokens": 128
 }
-response = predictor.predict(payload)
-print(response)
+payloads.append(payload)
 
 payload = {
     "messages": [
@@ -50,5 +60,10 @@ payload = {
     ],
     "max_tokens": 128
 }
-response = predictor.predict(payload)
-print(response)
\ No newline at end of file
+payloads.append(payload)
+
+responses = predictor.predict_many(payloads)
+logger.info("All %d responses after %.0f ms", len(responses), (time.perf_counter() - start) * 1000)
+for response in responses:
+    print(response)
+predictor.close()
\ No newline at end of file
@@ -3,13 +3,17 @@
 # snippet-start:[python.example_code.bedrock-runtime.InvokeModel_AnthropicClaude]
 # Use the native inference API to send a text message to Anthropic Claude.
 
-import boto3
 import json
 
+from bedrock_clients import get_model_client
 from botocore.exceptions import ClientError
+from metrics import report_at_exit
 
-# Create a Bedrock Runtime client in the AWS Region of your choice.
-client = boto3.client("bedrock-runtime", region_name="us-east-1")
+# Get the shared Bedrock Runtime client for the AWS Region of your choice.
+# Calls are rate limited and retried on throttling, timed and counted (a summary
+# is printed at exit), and cached when BEDROCK_CACHE_PATH is set.
+client = get_model_client(region_name="us-east-1")
+report_at_exit()
 
 # Set the model ID, e.g., Claude 3 Haiku.
 model_id = "anthropic.claude-3-haiku-20240307-v1:0"
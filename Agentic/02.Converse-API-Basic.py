@@ -3,10 +3,17 @@
 Shows how to use the Converse API with Anthropic Claude 3 to generate conversation without any interface
 """
 
+import argparse
 import logging
-import boto3
 
+from agent_tools import registry
+from bedrock_clients import get_model_client
 from botocore.exceptions import ClientError
+from history import DEFAULT_MAX_TOKENS, HistoryManager
+from metrics import report_at_exit
+from model_router import ROUTE_AUTO, routed_client
+from session_store import SessionStore
+from streaming import print_stream_timing, stream_converse
 
 
 logger = logging.getLogger(__name__)
@@ -16,7 +23,7 @@ logging.basicConfig(level=logging.INFO)
 def generate_conversation(bedrock_client,
                           model_id,
                           system_prompts,
-                          messages, tool_list):
+                          messages, tool_config, stream=False, history=None):
 
     logger.info("Generating message with model %s", model_id)
 
@@ -29,114 +36,56 @@ def generate_conversation(bedrock_client,
     # Additional inference parameters to use.
     additional_model_fields = {"top_k": top_k}
 
-    # Send the message.
-    response = bedrock_client.converse(
+    # Only the part of the conversation that fits the token budget is re-sent.
+    if history is not None:
+        messages = history.compact(messages)
+
+    request = dict(
         modelId=model_id,
         messages=messages,
         system=system_prompts,
         inferenceConfig=inference_config,
-        #toolConfig={"tools": tool_list},
+        #toolConfig=tool_config,
         additionalModelRequestFields=additional_model_fields
     )
+
+    # Send the message, streaming the answer as it is generated if asked to.
+    if stream:
+        response = stream_converse(bedrock_client, **request)
+        print_stream_timing(response)
+    else:
+        response = bedrock_client.converse(**request)
     
-    
-    # Print token usage information
-    if 'usage' in response:
-        print("\nToken Usage:")
-        print(f"Input tokens: {response['usage']['inputTokens']}")
-        print(f"Output tokens: {response['usage']['outputTokens']}")
-        print(f"Total tokens: {response['usage']['totalTokens']}")
-
-    # Log token usage.
+
+    # Log token usage (timings and totals are collected by the metered client).
     token_usage = response['usage']
     logger.info("Input tokens: %s", token_usage['inputTokens'])
     logger.info("Output tokens: %s", token_usage['outputTokens'])
     logger.info("Total tokens: %s", token_usage['totalTokens'])
     logger.info("Stop reason: %s", response['stopReason'])
+    if "routing" in response:
+        logger.info("Routed to: %s", response['routing']['modelId'])
 
     return response
 
-def create_bedrock_client(region_name="us-east-1"):
-    """Create a Bedrock Runtime client"""
-    session = boto3.Session()
-    return session.client('bedrock-runtime', region_name=region_name)
-
-# added teh tools in the basic to check how it can create the output as per the tool.
-def get_tool_list():
-    """Define and return the tool list for the LLM to use. These tools will be created dynamically, 
-    example crete lambda function and deploy python code will be dynamically generated """
-    return [
-        {
-            "toolSpec": {
-                "name": "cosine",
-                "description": "Calculate the cosine of x.",
-                "inputSchema": {
-                    "json": {
-                        "type": "object",
-                        "properties": {
-                            "x": {
-                                "type": "number",
-                                "description": "The number to pass to the function.",
-                            }
-                        },
-                        "required": ["x"],
-                    }
-                },
-            }
-        },
-        {
-            "toolSpec": {
-                "name": "create_lambda_function",
-                "description": "Create and deploy a Lambda function.",
-                "inputSchema": {
-                    "json": {
-                        "type": "object",
-                        "properties": {
-                            "code": {
-                                "type": "string",
-                                "description": "The Python code for the Lambda function.",
-                            },
-                            "function_name": {
-                                "type": "string",
-                                "description": "The name of the Lambda function.",
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "A description of the Lambda function.",
-                            },
-                            "has_external_python_libraries": {
-                                "type": "boolean",
-                                "description": "Whether the function uses external Python libraries.",
-                            },
-                            "external_python_libraries": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "List of external Python libraries to include.",
-                            },
-                        },
-                        "required": [
-                            "code",
-                            "function_name",
-                            "description",
-                            "has_external_python_libraries",
-                            "external_python_libraries",
-                        ],
-                    }
-                },
-            }
-        },
-    ]
-
-def main():
+def create_bedrock_client(region_name="us-east-1", route=False):
+    """Return the shared, pooled Bedrock Runtime client (rate limited, metered, optionally cached),
+    behind the model router when route is set"""
+    if route:
+        return routed_client(region_name)
+    return get_model_client(region_name)
+
+def main(stream=False, max_history_tokens=DEFAULT_MAX_TOKENS,
+         model_id="anthropic.claude-3-sonnet-20240229-v1:0", session_id=None):
     """
     Entrypoint for model
     """
     logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    report_at_exit()
 
-    model_id = "anthropic.claude-3-sonnet-20240229-v1:0" #can use any other model of choice
-    
-    # Get the tool list
-    tool_list = get_tool_list()
+    # Get the tool config shared with the tool-use script
+    # (added the tools in the basic to check how it can create the output as per the tool)
+    tool_config = registry.tool_config
 
     # Setup the system prompts and messages to send to the model.
     #system_prompts = [{"text": "You are an app that creates playlists for a radio station that plays rock and pop music. Only return song names and the artist."}]
@@ -151,28 +100,49 @@ def main():
         "content": [{"text": "Make sure the songs are by artists from the United Kingdom."}]
     }
     messages = []
+    history = HistoryManager(max_tokens=max_history_tokens)
+
+    # With a session, the conversation is saved as it goes and continued on the next run.
+    # Only the recent turns that fit the history budget are read back.
+    store = None
+    if session_id:
+        store = SessionStore()
+        if store.exists(session_id):
+            messages = store.load_tail(session_id, max_history_tokens)
+            logger.info("Resumed session %s (%d messages loaded)", session_id, len(messages))
+        else:
+            store.create(session_id)
+
+    def save_turn(user_message, output_message):
+        # A turn is saved only once it is answered, so a failed call never
+        # leaves an unanswered user message in the session.
+        if store is not None:
+            store.append(session_id, user_message, output_message)
 
     try:
 
         #bedrock_client = boto3.client(service_name='bedrock-runtime')
-        bedrock_client = create_bedrock_client()
+        # model_id "auto" lets the router pick a model per request
+        bedrock_client = create_bedrock_client(route=model_id == ROUTE_AUTO)
 
         # Start the conversation with the 1st message.
         messages.append(message_1)
         response = generate_conversation(
-            bedrock_client, model_id, system_prompts, messages, tool_list)
+            bedrock_client, model_id, system_prompts, messages, tool_config, stream, history)
 
         # Add the response message to the conversation.
         output_message = response['output']['message']
         messages.append(output_message)
+        save_turn(message_1, output_message)
 
         # Continue the conversation with the 2nd message.
         messages.append(message_2)
         response = generate_conversation(
-            bedrock_client, model_id, system_prompts, messages, tool_list)
+            bedrock_client, model_id, system_prompts, messages, tool_config, stream, history)
 
         output_message = response['output']['message']
         messages.append(output_message)
+        save_turn(message_2, output_message)
 
         # Show the complete conversation.
         for message in messages:
@@ -192,4 +162,13 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Basic Bedrock Converse conversation")
+    parser.add_argument("--stream", action="store_true", help="stream answers with converse_stream")
+    parser.add_argument("--max-history-tokens", type=int, default=DEFAULT_MAX_TOKENS,
+                        help="token budget for the conversation history re-sent each turn")
+    parser.add_argument("--model-id", default="anthropic.claude-3-sonnet-20240229-v1:0",
+                        help="model to use (can use any other model of choice), or 'auto' to route by prompt and budget")
+    parser.add_argument("--session", help="session id: save the conversation and continue it on later runs")
+    args = parser.parse_args()
+    main(stream=args.stream, max_history_tokens=args.max_history_tokens, model_id=args.model_id,
+         session_id=args.session)
@@ -1,15 +1,20 @@
+import time
+
+start = time.perf_counter()
 
-import boto3
-from sagemaker.predictor import retrieve_default
 import logging
 
+from sagemaker_endpoint import get_predictor
+
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 logger.info("Set the SM Jumstart endpoint")
 endpoint_name = "jumpstart-dft-deepseek-llm-r1-disti-20250401-105354"
-predictor = retrieve_default(endpoint_name)
+# Endpoint metadata is cached on disk; the sagemaker SDK is only imported on a cache miss.
+predictor = get_predictor(endpoint_name)
+logger.info("Predictor ready in %.0f ms", (time.perf_counter() - start) * 1000)
 logger.info("Set the query")
 payload = {
     "messages": [
@@ -22,6 +27,7 @@ payload = {
 }
 
 response = predictor.predict(payload)
+logger.info("First response after %.0f ms", (time.perf_counter() - start) * 1000)
 print(response)
 
 # payload = {
@@ -0,0 +1,97 @@
+# Streaming Q&A with Bedrock on the command line
+"""
+Ask a Bedrock model questions with the native streaming API
+(invoke_model_with_response_stream). Tokens are printed as they arrive and
+the time to first token is reported for each answer. Anthropic Claude and
+Meta Llama models are supported.
+
+    python "05.QnA-Bedrock-Stream.py" "Describe the purpose of a 'hello world' program in one line."
+    python "05.QnA-Bedrock-Stream.py" --model-id meta.llama3-8b-instruct-v1:0 < questions.txt
+"""
+import argparse
+import sys
+
+from bedrock_clients import get_model_client
+from botocore.exceptions import ClientError
+from metrics import report_at_exit
+from streaming import print_stream_timing, stream_invoke_model
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+def model_format(model_id):
+    """Native request format of a model id: "anthropic" or "llama"."""
+    if "anthropic" in model_id:
+        return "anthropic"
+    if "llama" in model_id or "meta." in model_id:
+        return "llama"
+    raise ValueError(f"Can't tell the native format of '{model_id}', use --format")
+
+
+def build_native_request(prompt, request_format, max_tokens=512, temperature=0.5):
+    """Format the request payload using the model's native structure."""
+    if request_format == "anthropic":
+        return {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [{"type": "text", "text": prompt}],
+                }
+            ],
+        }
+    # Embed the prompt in Llama 3's instruction format.
+    formatted_prompt = f"""
+<|begin_of_text|><|start_header_id|>user<|end_header_id|>
+{prompt}
+<|eot_id|>
+<|start_header_id|>assistant<|end_header_id|>
+"""
+    return {
+        "prompt": formatted_prompt,
+        "max_gen_len": max_tokens,
+        "temperature": temperature,
+    }
+
+
+def read_prompts(args):
+    """The prompt from argv, else one prompt per non-empty stdin line."""
+    if args.prompt:
+        yield " ".join(args.prompt)
+        return
+    if sys.stdin.isatty():
+        print("Enter a question per line (Ctrl-D to finish):", file=sys.stderr)
+    for line in sys.stdin:
+        if line.strip():
+            yield line.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming Q&A with a Bedrock model")
+    parser.add_argument("prompt", nargs="*", help="question to ask (default: read questions from stdin)")
+    parser.add_argument("--model-id", default=MODEL_ID)
+    parser.add_argument("--format", choices=["anthropic", "llama"], help="native request format (default: from the model id)")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--temperature", type=float, default=0.5)
+    args = parser.parse_args()
+
+    request_format = args.format or model_format(args.model_id)
+    client = get_model_client(region_name=args.region)
+    report_at_exit()
+
+    for prompt in read_prompts(args):
+        request = build_native_request(prompt, request_format, args.max_tokens, args.temperature)
+        try:
+            response = stream_invoke_model(client, args.model_id, request)
+        except (ClientError, Exception) as e:
+            print(f"ERROR: Can't invoke '{args.model_id}'. Reason: {e}")
+            return 1
+        print_stream_timing(response)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Reusable Converse agent loop.
+
+The loop keeps calling the model until it stops asking for tools (or an
+iteration cap is hit). Independent toolUse blocks from the same assistant
+turn are run concurrently on a bounded thread pool, so a turn costs the time
+of its slowest tool instead of the sum of all of them.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from prompt_cache import supports_prompt_caching, with_cache_points
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ITERATIONS = 10
+DEFAULT_MAX_TOOL_WORKERS = 8
+
+_tool_executor = None
+
+
+def get_tool_executor(max_workers=DEFAULT_MAX_TOOL_WORKERS):
+    """Return the shared thread pool used to run tools."""
+    global _tool_executor
+    if _tool_executor is None:
+        _tool_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+    return _tool_executor
+
+
+def build_converse_request(model_id, system_prompt, tool_config, message_list,
+                           inference_config=None, history=None):
+    """
+    Build the converse/converse_stream parameters for one turn.
+
+    The history is compacted to its token budget, then prompt cache checkpoints
+    are added after the system prompt, the tools and the stable history when the
+    model supports them. message_list itself is not modified.
+    """
+    system = [{"text": system_prompt}]
+    if history is not None:
+        message_list = history.compact(message_list)
+    if supports_prompt_caching(model_id):
+        system, tool_config, message_list = with_cache_points(system, tool_config, message_list)
+    request = dict(modelId=model_id, messages=message_list, system=system)
+    if tool_config:
+        request["toolConfig"] = tool_config
+    if inference_config:
+        request["inferenceConfig"] = inference_config
+    return request
+
+
+def tool_error_result(tool_use_block, error):
+    """Build a toolResult block reporting a failed tool call back to the model."""
+    return {
+        "toolResult": {
+            "toolUseId": tool_use_block["toolUseId"],
+            "content": [{"text": f"Error: {error}"}],
+            "status": "error",
+        }
+    }
+
+
+def run_tool_safely(tool_handler, tool_use_block):
+    """Run a tool, turning any exception into an error toolResult."""
+    try:
+        return tool_handler(tool_use_block)
+    except Exception as e:
+        logger.exception("Tool %s failed", tool_use_block["name"])
+        return tool_error_result(tool_use_block, e)
+
+
+def execute_tool_uses(tool_use_blocks, tool_handler, executor=None):
+    """
+    Run every toolUse block concurrently and return their toolResult blocks.
+
+    Args:
+        tool_use_blocks (list): "toolUse" dicts from one assistant message
+        tool_handler (callable): takes a toolUse dict, returns a toolResult content block
+        executor: thread pool to use, defaults to the shared tool executor
+
+    Returns:
+        list: toolResult content blocks, in the same order as tool_use_blocks
+    """
+    if not tool_use_blocks:
+        return []
+    if len(tool_use_blocks) == 1:
+        return [run_tool_safely(tool_handler, tool_use_blocks[0])]
+
+    executor = executor or get_tool_executor()
+    futures = [
+        executor.submit(run_tool_safely, tool_handler, block)
+        for block in tool_use_blocks
+    ]
+    return [future.result() for future in futures]
+
+
+def get_tool_use_blocks(message):
+    """Return the toolUse dicts contained in an assistant message."""
+    return [block["toolUse"] for block in message["content"] if "toolUse" in block]
+
+
+def run_agent_loop(converse_fn, message_list, tool_handler,
+                   max_iterations=DEFAULT_MAX_ITERATIONS, on_message=None, executor=None):
+    """
+    Drive a Converse conversation until the model stops requesting tools.
+
+    Args:
+        converse_fn (callable): takes the message list, returns a Converse response
+        message_list (list): conversation so far; assistant and toolResult
+            messages are appended to it in place
+        tool_handler (callable): takes a toolUse dict, returns a toolResult content block
+        max_iterations (int): cap on model calls for this loop
+        on_message (callable): optional hook called with each assistant message
+        executor: thread pool for tool calls, defaults to the shared tool executor
+
+    Returns:
+        dict: the last Converse response
+    """
+    response = None
+    for iteration in range(1, max_iterations + 1):
+        response = converse_fn(message_list)
+        response_message = response["output"]["message"]
+        message_list.append(response_message)
+        if on_message:
+            on_message(response_message)
+
+        if response["stopReason"] != "tool_use":
+            return response
+
+        tool_use_blocks = get_tool_use_blocks(response_message)
+        logger.info("Iteration %d: running %d tool call(s)", iteration, len(tool_use_blocks))
+        tool_results = execute_tool_uses(tool_use_blocks, tool_handler, executor)
+        message_list.append({"role": "user", "content": tool_results})
+
+    logger.warning("Stopped after %d iterations with the model still requesting tools", max_iterations)
+    return response
+
+
+def run_streaming_agent_loop(stream_fn, message_list, tool_handler,
+                             max_iterations=DEFAULT_MAX_ITERATIONS, on_message=None, executor=None):
+    """
+    Streaming variant of run_agent_loop().
+
+    stream_fn takes (message_list, on_tool_use) and returns a Converse-shaped
+    response (see streaming.stream_converse). Each toolUse block is submitted
+    to the tool pool from on_tool_use as soon as the model closes it, so tools
+    run while the rest of the message is still streaming.
+    """
+    executor = executor or get_tool_executor()
+    response = None
+    for iteration in range(1, max_iterations + 1):
+        futures = []
+
+        def start_tool(tool_use_block):
+            futures.append(executor.submit(run_tool_safely, tool_handler, tool_use_block))
+
+        response = stream_fn(message_list, start_tool)
+        response_message = response["output"]["message"]
+        message_list.append(response_message)
+        if on_message:
+            on_message(response_message)
+
+        if response["stopReason"] != "tool_use":
+            return response
+
+        logger.info("Iteration %d: waiting on %d tool call(s)", iteration, len(futures))
+        tool_results = [future.result() for future in futures]
+        message_list.append({"role": "user", "content": tool_results})
+
+    logger.warning("Stopped after %d iterations with the model still requesting tools", max_iterations)
+    return response
@@ -0,0 +1,332 @@
+"""Tools offered to the model by the Converse scripts.
+
+Each tool is declared once on the shared registry; the scripts send
+registry.tool_config as the Converse toolConfig and route toolUse blocks
+through registry.dispatch().
+"""
+import math
+import os
+import threading
+from typing import List
+
+import sandbox
+import utils as lambda_helpers
+from botocore.exceptions import ClientError
+from tool_registry import ToolRegistry
+
+# Retrieve environment variables
+#LAMBDA_ROLE = os.environ["LAMBDA_ROLE"]
+#S3_BUCKET = os.environ["S3_BUCKET"]
+LAMBDA_ROLE = os.getenv("LAMBDA_ROLE")
+S3_BUCKET = os.getenv("S3_BUCKET")
+
+registry = ToolRegistry()
+
+# Layer version ARN per dependency set, so each set is looked up once per process
+_layer_arns = {}
+# One lock per layer name: concurrent deploys with the same requirements
+# wait for a single lookup/publish instead of each publishing a version.
+_layer_locks = {}
+_layer_locks_lock = threading.Lock()
+
+
+@registry.tool(
+    description="Calculate the cosine of x.",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "x": {
+                "type": "number",
+                "description": "The number to pass to the function.",
+            }
+        },
+        "required": ["x"],
+    },
+)
+def cosine(x: float) -> float:
+    """Calculate the cosine of x."""
+    result = math.cos(x)
+    print(f"Cosine result: {result}")
+    return result
+
+
+UNARY_OPERATIONS = (
+    "sin", "cos", "tan", "arcsin", "arccos", "arctan", "sinh", "cosh", "tanh",
+    "exp", "log", "log10", "log2", "sqrt", "abs", "square",
+)
+BINARY_OPERATIONS = ("add", "subtract", "multiply", "divide", "power")
+STATISTICS = ("sum", "mean", "median", "std", "var", "min", "max", "describe")
+
+
+@registry.tool(
+    description="Apply one math operation to a whole array of numbers in a single call. "
+                "Element-wise: " + ", ".join(UNARY_OPERATIONS) + "; "
+                "element-wise with 'other' (a number or an array of the same length): "
+                + ", ".join(BINARY_OPERATIONS) + "; "
+                "statistics over the array: " + ", ".join(STATISTICS) + ". "
+                "Use this instead of calling cosine once per value.",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "operation": {
+                "type": "string",
+                "enum": list(UNARY_OPERATIONS + BINARY_OPERATIONS + STATISTICS),
+                "description": "The operation to apply.",
+            },
+            "values": {
+                "type": "array",
+                "items": {"type": "number"},
+                "minItems": 1,
+                "description": "The input numbers.",
+            },
+            "other": {
+                "type": ["number", "array"],
+                "items": {"type": "number"},
+                "description": "Second operand of add, subtract, multiply, divide and power.",
+            },
+            "decimals": {
+                "type": "integer",
+                "description": "Round results to this many decimals (default 6).",
+            },
+        },
+        "required": ["operation", "values"],
+    },
+)
+def batch_math(operation: str, values: List[float], other=None, decimals: int = 6):
+    """Apply a math operation to an array of numbers with NumPy."""
+    # numpy is only needed (and loaded) once the model actually uses this tool
+    import numpy as np
+
+    array = np.asarray(values, dtype=np.float64)
+    with np.errstate(all="ignore"):
+        if operation in UNARY_OPERATIONS:
+            result = getattr(np, operation)(array)
+        elif operation in BINARY_OPERATIONS:
+            if other is None:
+                raise ValueError(f"'{operation}' needs 'other'")
+            operand = np.asarray(other, dtype=np.float64)
+            if operand.ndim and operand.shape != array.shape:
+                raise ValueError(f"'other' has {operand.size} values, 'values' has {array.size}")
+            result = getattr(np, operation)(array, operand)
+        elif operation == "describe":
+            summary = {"count": int(array.size)}
+            for name in ("sum", "mean", "median", "std", "min", "max"):
+                summary[name] = _to_json_number(getattr(np, name)(array), decimals)
+            return summary
+        else:
+            return _to_json_number(getattr(np, operation)(array), decimals)
+    # NaN and infinities (e.g. log of a negative number) are not valid JSON
+    result = np.round(result, decimals)
+    return [None if not math.isfinite(value) else value for value in result.tolist()]
+
+
+def _to_json_number(value, decimals):
+    value = round(float(value), decimals)
+    return value if math.isfinite(value) else None
+
+
+def get_dependency_layer(lambda_client, s3, dependencies, runtime="python3.12"):
+    """
+    Return the ARN of the layer holding a dependency set, publishing it the
+    first time the set is used. Layers are named by the hash of the sorted
+    requirements, so every function using the same libraries shares one.
+    """
+    name = lambda_helpers.layer_name(dependencies)
+    with _layer_locks_lock:
+        lock = _layer_locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _layer_arns:
+            _layer_arns[name] = _find_or_publish_layer(lambda_client, s3, name, dependencies, runtime)
+    return _layer_arns[name]
+
+
+def _find_or_publish_layer(lambda_client, s3, name, dependencies, runtime):
+    """Return the newest version ARN of layer name, publishing the first version if there is none."""
+    versions = lambda_client.list_layer_versions(LayerName=name, CompatibleRuntime=runtime)["LayerVersions"]
+    if versions:
+        arn = versions[0]["LayerVersionArn"]
+    else:
+        layer = lambda_helpers.build_layer_package(dependencies)
+        layer_key, _ = lambda_helpers.upload_artifact(
+            s3, S3_BUCKET, layer, prefix=lambda_helpers.LAYER_ARTIFACT_PREFIX
+        )
+        arn = lambda_client.publish_layer_version(
+            LayerName=name,
+            Description=", ".join(lambda_helpers.normalize_requirements(dependencies))[:256],
+            Content={"S3Bucket": S3_BUCKET, "S3Key": layer_key},
+            CompatibleRuntimes=[runtime],
+            CompatibleArchitectures=["x86_64"],
+        )["LayerVersionArn"]
+        print(f"Published layer {arn}")
+    return arn
+
+
+@registry.tool(
+    description="Create and deploy a Lambda function.",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "code": {
+                "type": "string",
+                "description": "The Python code for the Lambda function.",
+            },
+            "function_name": {
+                "type": "string",
+                "description": "The name of the Lambda function.",
+            },
+            "description": {
+                "type": "string",
+                "description": "A description of the Lambda function.",
+            },
+            "has_external_python_libraries": {
+                "type": "boolean",
+                "description": "Whether the function uses external Python libraries.",
+            },
+            "external_python_libraries": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "List of external Python libraries to include.",
+            },
+        },
+        "required": [
+            "code",
+            "function_name",
+            "description",
+            "has_external_python_libraries",
+            "external_python_libraries",
+        ],
+    },
+    context=("lambda_client", "s3"),
+)
+def create_lambda_function(
+    lambda_client,
+    s3,
+    code: str,
+    function_name: str,
+    description: str,
+    has_external_python_libraries: bool,
+    external_python_libraries: List[str],
+) -> str:
+    """
+    Creates and deploys a Lambda Function, based on what the customer requested.
+    An existing function is updated only when its code changed.
+    Returns the name of the created Lambda function
+    """
+    runtime = "python3.12"
+    handler = "lambda_function.handler"
+
+    # The function zip holds only lambda_function.py (byte-identical for identical
+    # code); external libraries come from a shared layer per dependency set
+    package = lambda_helpers.build_lambda_package(code)
+
+    deployed_function = "psd" + function_name
+    _, code_sha256 = lambda_helpers.package_sha256(package)
+
+    try:
+        layers = []
+        if has_external_python_libraries and external_python_libraries:
+            layers = [get_dependency_layer(lambda_client, s3, external_python_libraries, runtime)]
+
+        # Redeploying unchanged code is only a metadata check
+        try:
+            current = lambda_client.get_function(FunctionName=deployed_function)["Configuration"]
+        except lambda_client.exceptions.ResourceNotFoundException:
+            current = None
+        if current is not None:
+            code_changed = current["CodeSha256"] != code_sha256
+            layers_changed = [layer["Arn"] for layer in current.get("Layers", [])] != layers
+            if not code_changed and not layers_changed:
+                print(f"Lambda function {deployed_function} is already up to date")
+                return f"The function {deployed_function} is already deployed with this code. I will now provide my final answer to the customer on how to invoke the {deployed_function} function with boto3 and print the result."
+
+            if layers_changed:
+                lambda_client.update_function_configuration(FunctionName=deployed_function, Layers=layers)
+                lambda_client.get_waiter("function_updated_v2").wait(FunctionName=deployed_function)
+            if code_changed:
+                # Upload the package to S3 under its content hash (skipped if already there)
+                zip_key, uploaded = lambda_helpers.upload_artifact(s3, S3_BUCKET, package)
+                print(f"{'Uploaded' if uploaded else 'Reusing'} zip {S3_BUCKET}/{zip_key}")
+                lambda_client.update_function_code(
+                    FunctionName=deployed_function,
+                    S3Bucket=S3_BUCKET,
+                    S3Key=zip_key,
+                    Publish=True,
+                )
+            else:
+                lambda_client.publish_version(FunctionName=deployed_function)
+            print("Lambda function updated successfully")
+            return f"The function {deployed_function} has been updated in the customer's AWS account. I will now provide my final answer to the customer on how to invoke the {deployed_function} function with boto3 and print the result."
+
+        zip_key, uploaded = lambda_helpers.upload_artifact(s3, S3_BUCKET, package)
+        print(f"{'Uploaded' if uploaded else 'Reusing'} zip {S3_BUCKET}/{zip_key}")
+
+        #Create the lambda function based on the code zip uploaded in S3
+        response = lambda_client.create_function(
+            Code={
+                "S3Bucket": S3_BUCKET,
+                "S3Key": zip_key,
+            },
+            Description=description,
+            FunctionName=deployed_function,
+            Handler=handler,
+            Timeout=30,
+            Publish=True,
+            Role=LAMBDA_ROLE,
+            Runtime=runtime,
+            Layers=layers,
+        )
+        print("Lambda function created successfully")
+        #Create the final response for user along with the lambda function details
+        deployed_function = response["FunctionName"]
+        user_response = f"The function {deployed_function} has been deployed to the customer's AWS account. I will now provide my final answer to the customer on how to invoke the {deployed_function} function with boto3 and print the result."
+        return user_response
+    except ClientError as e:
+        print(e)
+        return f"Error: {e}\n Let me try again..."
+
+
+def test_lambda_function(
+    code: str,
+    event: dict = None,
+    has_external_python_libraries: bool = False,
+    external_python_libraries: List[str] = (),
+) -> dict:
+    """
+    Runs the Lambda code locally against a sample event, in a sandboxed
+    subprocess, and returns the handler's result or the traceback.
+    """
+    dependencies = external_python_libraries if has_external_python_libraries else None
+    return sandbox.run_handler_pooled(code, event, dependencies=dependencies)
+
+
+# Local testing is opt-in: set LAMBDA_LOCAL_TEST=1 to offer the tool to the model.
+if os.getenv("LAMBDA_LOCAL_TEST", "0") != "0":
+    registry.register(
+        "test_lambda_function",
+        "Run Lambda function code locally against a sample event before deploying it. "
+        "Returns the handler's result, or the error and traceback, plus anything it printed.",
+        {
+            "type": "object",
+            "properties": {
+                "code": {
+                    "type": "string",
+                    "description": "The Python code for the Lambda function (handler named 'handler').",
+                },
+                "event": {
+                    "type": "object",
+                    "description": "Sample event passed to the handler.",
+                },
+                "has_external_python_libraries": {
+                    "type": "boolean",
+                    "description": "Whether the function uses external Python libraries.",
+                },
+                "external_python_libraries": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "List of external Python libraries to include.",
+                },
+            },
+            "required": ["code"],
+        },
+        test_lambda_function,
+    )
@@ -0,0 +1,107 @@
+"""Asyncio runtime for running many Converse agent conversations in one process.
+
+boto3 is blocking, so model calls run on a dedicated thread pool sized to
+the concurrency limit (with a matching HTTP connection pool), and tool calls
+on a separate pool so slow tools never starve model calls. A semaphore caps
+the number of conversations in flight.
+
+    runtime = AsyncAgentRuntime(max_concurrency=200)
+    results = asyncio.run(runtime.run_many(conversations))
+"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import agent
+from bedrock_clients import get_model_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 64
+DEFAULT_TOOL_WORKERS = 16
+
+
+class AsyncAgentRuntime:
+    """Drive independent Converse conversations concurrently with a concurrency limit."""
+
+    def __init__(self, client=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 tool_workers=DEFAULT_TOOL_WORKERS, region_name="us-east-1"):
+        """
+        Args:
+            client: Bedrock Runtime client; defaults to the shared model client
+                with a connection pool as large as max_concurrency
+            max_concurrency (int): conversations (and model calls) in flight at once
+            tool_workers (int): threads for running tools
+        """
+        self.max_concurrency = max_concurrency
+        self.client = client or get_model_client(region_name, max_pool_connections=max_concurrency)
+        self._model_executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="model")
+        self._tool_executor = ThreadPoolExecutor(max_workers=tool_workers, thread_name_prefix="tool")
+        self._semaphore = None
+
+    async def _run_blocking(self, executor, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+    async def converse(self, **request):
+        """Call client.converse without blocking the event loop."""
+        return await self._run_blocking(self._model_executor, self.client.converse, **request)
+
+    async def run_tools(self, tool_use_blocks, tool_handler):
+        """Run the toolUse blocks of one turn concurrently; results keep their order."""
+        return list(await asyncio.gather(*(
+            self._run_blocking(self._tool_executor, agent.run_tool_safely, tool_handler, block)
+            for block in tool_use_blocks
+        )))
+
+    async def run_conversation(self, message_list, build_request, tool_handler,
+                               max_iterations=agent.DEFAULT_MAX_ITERATIONS):
+        """
+        Async equivalent of agent.run_agent_loop().
+
+        Args:
+            message_list (list): conversation so far, appended to in place
+            build_request (callable): takes the message list, returns converse parameters
+            tool_handler (callable): takes a toolUse dict, returns a toolResult content block
+            max_iterations (int): cap on model calls for this conversation
+
+        Returns:
+            dict: the last Converse response
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            response = None
+            for iteration in range(1, max_iterations + 1):
+                response = await self.converse(**build_request(message_list))
+                response_message = response["output"]["message"]
+                message_list.append(response_message)
+                if response["stopReason"] != "tool_use":
+                    return response
+
+                tool_results = await self.run_tools(agent.get_tool_use_blocks(response_message), tool_handler)
+                message_list.append({"role": "user", "content": tool_results})
+
+            logger.warning("Stopped after %d iterations with the model still requesting tools", max_iterations)
+            return response
+
+    async def run_many(self, conversations):
+        """
+        Run many conversations concurrently.
+
+        Args:
+            conversations (iterable): dicts of run_conversation() keyword arguments
+
+        Returns:
+            list: the last response of each conversation, or the exception it
+            raised, in input order
+        """
+        return await asyncio.gather(
+            *(self.run_conversation(**conversation) for conversation in conversations),
+            return_exceptions=True,
+        )
+
+    def close(self):
+        self._model_executor.shutdown(wait=False)
+        self._tool_executor.shutdown(wait=False)
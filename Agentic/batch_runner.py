@@ -0,0 +1,209 @@
+"""Run prompts in bulk through the Converse tool loop, from JSONL to JSONL.
+
+Each input line is either {"id": ..., "prompt": "..."} or
+{"id": ..., "messages": [...]}, optionally with "system". Results are
+appended to the output file as they finish, one JSON line per item. The
+output file doubles as the checkpoint: when a run is restarted, items
+already written with status "ok" are skipped, so a crashed or killed run
+resumes without paying for finished items again.
+
+    python batch_runner.py prompts.jsonl results.jsonl --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+from agent import build_converse_request
+from async_agent import AsyncAgentRuntime
+from bedrock_clients import get_client
+from dotenv import load_dotenv
+from history import HistoryManager
+from metrics import report_at_exit
+
+load_dotenv()
+
+# The tools read LAMBDA_ROLE/S3_BUCKET at import, so load the .env first
+from agent_tools import registry
+
+logger = logging.getLogger(__name__)
+
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+SYSTEM_PROMPT = "You are an assistant capable of creating responses"
+INFERENCE_CONFIG = {"temperature": 0.7, "topP": 0.9, "maxTokens": 1000}
+REGION = "us-east-1"
+# Record statuses that are final: such items are not run again on resume.
+FINAL_STATUSES = {"ok", "invalid"}
+
+
+class InvalidItemError(ValueError):
+    """An input line that can never run (not JSON, or no prompt/messages)."""
+
+
+def read_items(path):
+    """
+    Yield (item_id, item) for each non-empty input line; the line number is the default id.
+
+    A line that is not a JSON object is yielded as (line number, InvalidItemError),
+    so it gets an "invalid" record instead of stopping the run.
+    """
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                yield str(line_number), InvalidItemError(f"Invalid JSON on line {line_number}: {e}")
+                continue
+            if not isinstance(item, dict):
+                yield str(line_number), InvalidItemError(f"Line {line_number} is not a JSON object")
+                continue
+            yield str(item.get("id", line_number)), item
+
+
+def read_finished_ids(path):
+    """Return ids already finished (ok or invalid) in an existing output file.
+
+    The file is compacted for the resumed run: records of failed items, which
+    are run again, are dropped, as is a torn last line left by a killed run.
+    So every id keeps a single record however often the run is resumed.
+    """
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    kept = []
+    compact = False
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                compact = True
+                break
+            record = json.loads(line)
+            if record.get("status") in FINAL_STATUSES and str(record["id"]) not in finished:
+                finished.add(str(record["id"]))
+                kept.append(line)
+            else:
+                compact = True
+    if compact:
+        # Written aside and renamed, so a crash here leaves the old checkpoint intact.
+        staging = path + ".tmp"
+        with open(staging, "wb") as f:
+            f.writelines(kept)
+        os.replace(staging, path)
+    return finished
+
+
+def initial_messages(item):
+    if isinstance(item, Exception):
+        raise item
+    if "messages" in item:
+        return list(item["messages"])
+    if "prompt" not in item:
+        raise InvalidItemError('Item has neither "prompt" nor "messages"')
+    return [{"role": "user", "content": [{"text": item["prompt"]}]}]
+
+
+def final_text(message):
+    return "".join(block.get("text", "") for block in message["content"])
+
+
+class BatchRunner:
+    """Feeds input items to an AsyncAgentRuntime and appends results to the output file."""
+
+    def __init__(self, runtime, output_path, model_id=MODEL_ID, max_history_tokens=None):
+        self.runtime = runtime
+        self.output_path = output_path
+        self.model_id = model_id
+        self.max_history_tokens = max_history_tokens
+        self.completed = 0
+        self.failed = 0
+        lambda_client = get_client("lambda", region_name=REGION)
+        s3 = get_client("s3", region_name=REGION)
+        self.tool_handler = lambda tool_use_block: registry.dispatch(
+            tool_use_block, lambda_client=lambda_client, s3=s3)
+
+    async def run_item(self, item_id, item, output):
+        history = HistoryManager(self.max_history_tokens) if self.max_history_tokens else None
+        start = time.perf_counter()
+        try:
+            # A malformed item fails on its own, with an error record like a failed call.
+            message_list = initial_messages(item)
+            system_prompt = item.get("system", SYSTEM_PROMPT)
+            response = await self.runtime.run_conversation(
+                message_list,
+                lambda messages: build_converse_request(
+                    self.model_id, system_prompt, registry.tool_config, messages, INFERENCE_CONFIG, history),
+                self.tool_handler,
+            )
+            record = {
+                "id": item_id,
+                "status": "ok",
+                "response_text": final_text(response["output"]["message"]),
+                "stop_reason": response["stopReason"],
+                "usage": response.get("usage", {}),
+                "messages": message_list,
+            }
+            self.completed += 1
+        except InvalidItemError as e:
+            # Final: resuming runs the same line into the same error, so it is not retried.
+            logger.warning("Item %s is invalid: %s", item_id, e)
+            record = {"id": item_id, "status": "invalid", "error": str(e)}
+            self.failed += 1
+        except Exception as e:
+            logger.warning("Item %s failed: %s", item_id, e)
+            record = {"id": item_id, "status": "error", "error": str(e)}
+            self.failed += 1
+        record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        # One write per record, flushed immediately, is the checkpoint.
+        output.write(json.dumps(record, default=str) + "\n")
+        output.flush()
+
+    async def run(self, items, concurrency):
+        """Run all items with at most `concurrency` in flight, reading the input lazily."""
+        pending = set()
+        with open(self.output_path, "a") as output:
+            for item_id, item in items:
+                if len(pending) >= concurrency:
+                    _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.add(asyncio.ensure_future(self.run_item(item_id, item, output)))
+            if pending:
+                await asyncio.wait(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run JSONL prompts through the Converse tool loop")
+    parser.add_argument("input", help="input JSONL: {id, prompt} or {id, messages} per line")
+    parser.add_argument("output", help="output JSONL, also used as the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--model-id", default=MODEL_ID)
+    parser.add_argument("--max-history-tokens", type=int, default=None,
+                        help="token budget for the history re-sent each turn (default: unlimited)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    report_at_exit()
+
+    finished = read_finished_ids(args.output)
+    if finished:
+        logger.info("Resuming: %d item(s) already done in %s", len(finished), args.output)
+    items = ((item_id, item) for item_id, item in read_items(args.input) if item_id not in finished)
+
+    runtime = AsyncAgentRuntime(max_concurrency=args.concurrency)
+    runner = BatchRunner(runtime, args.output, args.model_id, args.max_history_tokens)
+    start = time.perf_counter()
+    try:
+        asyncio.run(runner.run(items, args.concurrency))
+    finally:
+        runtime.close()
+    elapsed = time.perf_counter() - start
+    print(f"Finished {runner.completed} item(s), {runner.failed} failed, in {elapsed:.1f}s")
+    return 1 if runner.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
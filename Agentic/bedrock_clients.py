@@ -0,0 +1,131 @@
+"""Process-wide registry of pooled boto3 clients.
+
+Creating a boto3 session/client per call pays for credential resolution,
+endpoint resolution and a fresh TLS handshake every time. Every script should
+get its clients from here instead, so one client (and its connection pool) is
+reused for the lifetime of the process.
+"""
+import copy
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_REGION = "us-east-1"
+
+# Connection pool and timeout settings tuned for long-running model calls.
+DEFAULT_CLIENT_CONFIG = {
+    "max_pool_connections": 50,
+    "tcp_keepalive": True,
+    "connect_timeout": 5,
+    "read_timeout": 300,
+    "retries": {"max_attempts": 3, "mode": "standard"},
+}
+
+_session = None
+_clients = {}
+_hedged_clients = {}
+_lock = threading.RLock()
+
+
+def _freeze(value):
+    """Turn nested dicts/lists into something hashable for the registry key."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def get_session():
+    """Return the shared boto3 session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = boto3.Session()
+    return _session
+
+
+def get_client(service_name, region_name=DEFAULT_REGION, endpoint_url=None, **config_overrides):
+    """
+    Return a shared client for (service, region, endpoint, config).
+
+    Args:
+        service_name (str): boto3 service name, e.g. "bedrock-runtime"
+        region_name (str): AWS region name
+        endpoint_url (str): optional endpoint override (e.g. a local stub)
+        **config_overrides: botocore Config options overriding DEFAULT_CLIENT_CONFIG
+
+    Returns:
+        boto3.client: a client that is reused by every caller asking for the same key
+    """
+    # Deep copy: botocore rewrites the nested "retries" dict in place.
+    config = copy.deepcopy(dict(DEFAULT_CLIENT_CONFIG, **config_overrides))
+    key = (service_name, region_name, endpoint_url, _freeze(config))
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = get_session().client(
+                    service_name,
+                    region_name=region_name,
+                    endpoint_url=endpoint_url,
+                    config=Config(**config),
+                )
+                _clients[key] = client
+    return client
+
+
+def get_bedrock_client(region_name=DEFAULT_REGION, **kwargs):
+    """Return the shared Bedrock Runtime client for a region."""
+    return get_client("bedrock-runtime", region_name=region_name, **kwargs)
+
+
+def clear_clients():
+    """Drop all cached clients (and the session), e.g. after rotating credentials."""
+    global _session
+    with _lock:
+        _clients.clear()
+        _hedged_clients.clear()
+        _session = None
+
+
+def get_model_client(region_name=DEFAULT_REGION, throttle_attempts=None, limiter=None, hedge=None, **kwargs):
+    """
+    Return the Bedrock Runtime client the scripts send model calls through.
+
+    The shared client is wrapped, innermost first, with metrics (every attempt
+    is timed), the process-wide rate limiter (which owns throttling and
+    transient-error retries, so the SDK's own retries are turned off; its
+    retries are counted in the metrics) and the opt-in response cache.
+    throttle_attempts overrides how often a throttled call is tried, and
+    limiter replaces the process-wide rate limiter (e.g. one per region).
+
+    When BEDROCK_REGIONS lists more than one region (or hedge is True), calls
+    are hedged across those regions instead (see hedging.py) and region_name,
+    throttle_attempts and limiter are ignored: a throttled region fails over.
+    """
+    if hedge is None:
+        hedge = len([r for r in os.getenv("BEDROCK_REGIONS", "").split(",") if r.strip()]) > 1
+    if hedge:
+        from hedging import hedged_client
+
+        # Shared like the clients, so region health and latencies carry across callers.
+        key = (os.getenv("BEDROCK_REGIONS"), _freeze(kwargs))
+        with _lock:
+            if key not in _hedged_clients:
+                _hedged_clients[key] = hedged_client(**kwargs)
+            return _hedged_clients[key]
+
+    from metrics import metered
+    from rate_limit import DEFAULT_MAX_ATTEMPTS, rate_limited
+    from response_cache import maybe_cached
+
+    kwargs.setdefault("retries", {"max_attempts": 0, "mode": "standard"})
+    client = metered(get_bedrock_client(region_name, **kwargs))
+    return maybe_cached(rate_limited(
+        client, limiter=limiter, max_attempts=throttle_attempts or DEFAULT_MAX_ATTEMPTS,
+        on_retry=client.registry.record_retry))
@@ -0,0 +1,541 @@
+"""Local stand-in for Bedrock Runtime and SageMaker Runtime, for offline load tests.
+
+Speaks the request/response shapes used in this repo:
+
+    POST /model/{modelId}/converse
+    POST /model/{modelId}/converse-stream                    (AWS event stream)
+    POST /model/{modelId}/invoke                             (Anthropic / Llama native bodies)
+    POST /model/{modelId}/invoke-with-response-stream        (AWS event stream)
+    POST /endpoints/{endpointName}/invocations               (SageMaker invoke_endpoint)
+    GET  /stub/stats                                         (request and token counters)
+
+with configurable latency distributions, throttling injection, scripted
+tool-use responses, fake token usage and simulated prompt cache accounting.
+
+Point any script at it with the standard endpoint overrides, no code changes needed:
+
+    python bedrock_stub.py --port 8765 --latency lognormal:0.8,0.4 --throttle-rate 0.05
+    AWS_ENDPOINT_URL_BEDROCK_RUNTIME=http://127.0.0.1:8765 \\
+    AWS_ENDPOINT_URL_SAGEMAKER_RUNTIME=http://127.0.0.1:8765 \\
+    python 03.Converse-Agentic-Tool.py
+
+or in-process with start_stub_server(), which returns (server, endpoint_url).
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+PROMPT_CACHE_TTL = 300
+DEFAULT_OUTPUT_WORDS = 20
+
+
+def estimate_tokens(value):
+    """Rough token count of a JSON value (~4 characters per token)."""
+    return max(1, len(json.dumps(value, separators=(",", ":"))) // 4)
+
+
+def parse_latency(spec):
+    """
+    Turn a latency spec into a sampler returning seconds.
+
+    "0.5" or "fixed:0.5", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    "lognormal:MEDIAN,SIGMA" (a long right tail, like real model latency).
+    """
+    if callable(spec):
+        return spec
+    if spec is None:
+        return lambda: 0.0
+    if isinstance(spec, (int, float)):
+        return lambda: float(spec)
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    values = [float(v) for v in args.split(",")]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution '{kind}'")
+
+
+class PromptCacheSimulator:
+    """
+    Simulate Bedrock prompt cache accounting for requests with cachePoint blocks.
+
+    The prompt is walked in Bedrock's order (tools, system, messages). Prefixes
+    ending at a cachePoint are written to the cache; the longest prefix cached
+    within the TTL is a cache read, the rest up to the last cachePoint is a
+    cache write, and only what follows the last cachePoint is plain input.
+    """
+
+    def __init__(self, ttl=PROMPT_CACHE_TTL):
+        self.ttl = ttl
+        self._prefixes = {}
+        self._lock = threading.Lock()
+
+    def _segments(self, request):
+        for tool in request.get("toolConfig", {}).get("tools", []):
+            yield tool
+        for block in request.get("system", []):
+            yield block
+        for message in request.get("messages", []):
+            for block in message["content"]:
+                yield block
+
+    def account(self, request):
+        """Return the usage fields (input/cache read/cache write tokens) for a request."""
+        digest = hashlib.sha256()
+        tokens = 0
+        boundaries = []
+        checkpoints = []
+        for block in self._segments(request):
+            if "cachePoint" in block:
+                checkpoints.append((digest.hexdigest(), tokens))
+            else:
+                digest.update(json.dumps(block, sort_keys=True).encode("utf-8"))
+                tokens += estimate_tokens(block)
+                boundaries.append((digest.hexdigest(), tokens))
+
+        if not checkpoints:
+            return {"inputTokens": tokens}
+
+        now = time.time()
+        cached_tokens = checkpoints[-1][1]
+        read_tokens = 0
+        with self._lock:
+            # Like Bedrock, a checkpoint also hits prefixes cached by earlier
+            # requests at positions that are not marked in this one.
+            for prefix, prefix_tokens in boundaries:
+                if prefix_tokens > cached_tokens:
+                    break
+                seen = self._prefixes.get(prefix)
+                if seen is not None and now - seen <= self.ttl:
+                    read_tokens = prefix_tokens
+            for prefix, _ in checkpoints:
+                self._prefixes[prefix] = now
+        return {
+            "inputTokens": tokens - cached_tokens,
+            "cacheReadInputTokens": read_tokens,
+            "cacheWriteInputTokens": cached_tokens - read_tokens,
+        }
+
+
+class StubBackend:
+    """
+    Behaviour of the stub: latency, throttling, scripted answers and counters.
+
+    Args:
+        latency: latency spec (see parse_latency) for time to first token
+        token_delay (float): seconds per generated output word
+        output_words (int): length of generated answers
+        throttle_rate (float): probability of answering a call with a throttling error
+        requests_per_minute (int): simulated quota; calls over it are throttled
+        script (list): scripted responses, each {"match": regex, "text": ...} or
+            {"match": regex, "tool_use": {"name": ..., "input": {...}}}, matched
+            against the last user text of Converse requests
+    """
+
+    def __init__(self, latency=None, token_delay=0.0, output_words=DEFAULT_OUTPUT_WORDS,
+                 throttle_rate=0.0, requests_per_minute=None, script=None):
+        self.latency = parse_latency(latency)
+        self.token_delay = token_delay
+        self.output_words = output_words
+        self.throttle_rate = throttle_rate
+        self.requests_per_minute = requests_per_minute
+        self.script = [dict(rule, pattern=re.compile(rule.get("match", ""), re.I)) for rule in script or []]
+        self.prompt_cache = PromptCacheSimulator()
+        self.stats = defaultdict(int)
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def should_throttle(self):
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            return True
+        if self.requests_per_minute:
+            now = time.monotonic()
+            with self._lock:
+                while self._recent and now - self._recent[0] > 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.requests_per_minute:
+                    return True
+                self._recent.append(now)
+        return False
+
+    def answer_words(self, model_id):
+        """The generated answer as a list of words, each with its trailing space."""
+        words = f"Stub answer from {model_id}.".split(" ")
+        words += [f"word{i}" for i in range(self.output_words)]
+        return [word + " " for word in words[:max(1, self.output_words)]]
+
+    def converse_content(self, model_id, request):
+        """Return (content blocks, stop reason) for a Converse request."""
+        messages = request.get("messages", [])
+        last = messages[-1] if messages else {"content": []}
+        if not any("toolResult" in block for block in last["content"]):
+            user_text = " ".join(block.get("text", "") for block in last["content"])
+            for rule in self.script:
+                if rule["pattern"].search(user_text):
+                    if "tool_use" in rule:
+                        self.count("tool_use_responses")
+                        return [
+                            {"text": f"Calling {rule['tool_use']['name']}."},
+                            {"toolUse": {
+                                "toolUseId": f"tooluse_{random.getrandbits(48):012x}",
+                                "name": rule["tool_use"]["name"],
+                                "input": rule["tool_use"].get("input", {}),
+                            }},
+                        ], "tool_use"
+                    return [{"text": rule["text"]}], "end_turn"
+        return [{"text": "".join(self.answer_words(model_id)).strip()}], "end_turn"
+
+    def converse_usage(self, request, content):
+        usage = self.prompt_cache.account(request)
+        usage["outputTokens"] = estimate_tokens(content)
+        usage["totalTokens"] = sum(usage.values())
+        self.count("input_tokens", usage["inputTokens"] + usage.get("cacheReadInputTokens", 0)
+                   + usage.get("cacheWriteInputTokens", 0))
+        self.count("output_tokens", usage["outputTokens"])
+        return usage
+
+
+# AWS event stream framing (application/vnd.amazon.eventstream).
+def _encode_headers(headers):
+    encoded = b""
+    for name, value in headers.items():
+        name_bytes, value_bytes = name.encode("utf-8"), value.encode("utf-8")
+        encoded += struct.pack("!B", len(name_bytes)) + name_bytes
+        encoded += struct.pack("!BH", 7, len(value_bytes)) + value_bytes
+    return encoded
+
+
+def encode_event(event_type, payload):
+    """Encode one event stream message with a JSON payload."""
+    headers = _encode_headers({
+        ":event-type": event_type,
+        ":content-type": "application/json",
+        ":message-type": "event",
+    })
+    body = json.dumps(payload).encode("utf-8")
+    total_length = 12 + len(headers) + len(body) + 4
+    prelude = struct.pack("!II", total_length, len(headers))
+    prelude += struct.pack("!I", zlib.crc32(prelude))
+    message = prelude + headers + body
+    return message + struct.pack("!I", zlib.crc32(message))
+
+
+def converse_stream_events(content, stop_reason, usage, latency_ms):
+    """Yield (event type, payload) pairs for a streamed Converse answer."""
+    yield "messageStart", {"role": "assistant"}
+    for index, block in enumerate(content):
+        if "toolUse" in block:
+            tool_use = block["toolUse"]
+            yield "contentBlockStart", {"contentBlockIndex": index, "start": {
+                "toolUse": {"toolUseId": tool_use["toolUseId"], "name": tool_use["name"]}}}
+            raw_input = json.dumps(tool_use["input"])
+            # Split the input JSON into fragments, like the real service.
+            for start in range(0, len(raw_input), 16):
+                yield "contentBlockDelta", {"contentBlockIndex": index,
+                                            "delta": {"toolUse": {"input": raw_input[start:start + 16]}}}
+        else:
+            for word in re.findall(r"\S+\s*", block["text"]):
+                yield "contentBlockDelta", {"contentBlockIndex": index, "delta": {"text": word}}
+        yield "contentBlockStop", {"contentBlockIndex": index}
+    yield "messageStop", {"stopReason": stop_reason}
+    yield "metadata", {"usage": usage, "metrics": {"latencyMs": latency_ms}}
+
+
+def native_prompt_tokens(request):
+    if "messages" in request:
+        return estimate_tokens(request["messages"]) + estimate_tokens(request.get("system", ""))
+    return estimate_tokens(request.get("prompt", request.get("inputText", "")))
+
+
+def invoke_stream_chunks(request, words):
+    """Yield native streaming chunk payloads (Anthropic or Llama format)."""
+    input_tokens = native_prompt_tokens(request)
+    if "messages" in request:
+        yield {"type": "message_start", "message": {"role": "assistant", "usage": {"input_tokens": input_tokens}}}
+        yield {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+        for word in words:
+            yield {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": word}}
+        yield {"type": "content_block_stop", "index": 0}
+        yield {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": len(words)}}
+        yield {"type": "message_stop", "amazon-bedrock-invocationMetrics": {
+            "inputTokenCount": input_tokens, "outputTokenCount": len(words)}}
+    else:
+        for position, word in enumerate(words, 1):
+            chunk = {
+                "generation": word,
+                "prompt_token_count": input_tokens if position == 1 else None,
+                "generation_token_count": position,
+                "stop_reason": "stop" if position == len(words) else None,
+            }
+            if position == len(words):
+                chunk["amazon-bedrock-invocationMetrics"] = {
+                    "inputTokenCount": input_tokens, "outputTokenCount": len(words)}
+            yield chunk
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Route Bedrock Runtime and SageMaker Runtime REST calls to the StubBackend."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, keep-alive
+    # connections hit delayed-ACK stalls of ~40ms per response.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def backend(self):
+        return self.server.backend
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status, error_type, message):
+        self.backend.count(f"errors.{error_type}")
+        self._send_json(status, {"message": message}, {"x-amzn-ErrorType": error_type})
+
+    def _start_event_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_event_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/stub/stats":
+            self._send_json(200, self.backend.snapshot())
+        else:
+            self._send_error(404, "ResourceNotFoundException", f"Unknown path {self.path}")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw_body = self.rfile.read(length)
+        parts = [unquote(part) for part in self.path.split("?")[0].strip("/").split("/")]
+        backend = self.backend
+        backend.count("requests")
+        backend.count("request_bytes", length)
+
+        if backend.should_throttle():
+            self._send_error(429, "ThrottlingException", "Too many requests, please wait before trying again.")
+            return
+
+        try:
+            request = json.loads(raw_body or b"{}")
+        except ValueError:
+            self._send_error(400, "ValidationException", "Malformed input request")
+            return
+
+        started = time.perf_counter()
+        time.sleep(backend.latency())
+        if len(parts) == 3 and parts[0] == "model":
+            model_id, operation = parts[1], parts[2]
+            handler = {
+                "converse": self._converse,
+                "converse-stream": self._converse_stream,
+                "invoke": self._invoke,
+                "invoke-with-response-stream": self._invoke_stream,
+            }.get(operation)
+            if handler is None:
+                self._send_error(404, "UnknownOperationException", f"Unsupported operation {operation}")
+                return
+            backend.count(f"calls.{operation}")
+            handler(model_id, request, started)
+        elif len(parts) == 3 and parts[0] == "endpoints" and parts[2] == "invocations":
+            backend.count("calls.invoke_endpoint")
+            self._invoke_endpoint(parts[1], request)
+        else:
+            self._send_error(404, "ResourceNotFoundException", f"Unknown path {self.path}")
+
+    def _converse(self, model_id, request, started):
+        content, stop_reason = self.backend.converse_content(model_id, request)
+        time.sleep(self.backend.token_delay * estimate_tokens(content))
+        self._send_json(200, {
+            "output": {"message": {"role": "assistant", "content": content}},
+            "stopReason": stop_reason,
+            "usage": self.backend.converse_usage(request, content),
+            "metrics": {"latencyMs": int((time.perf_counter() - started) * 1000)},
+        })
+
+    def _converse_stream(self, model_id, request, started):
+        content, stop_reason = self.backend.converse_content(model_id, request)
+        usage = self.backend.converse_usage(request, content)
+        self._start_event_stream()
+        for event_type, payload in converse_stream_events(
+                content, stop_reason, usage, int((time.perf_counter() - started) * 1000)):
+            if event_type == "contentBlockDelta":
+                time.sleep(self.backend.token_delay)
+            self._send_chunk(encode_event(event_type, payload))
+        self._end_event_stream()
+
+    def _native_response(self, model_id, request, text, input_tokens, output_tokens):
+        if "messages" in request:
+            return {
+                "id": f"msg_{random.getrandbits(48):012x}",
+                "type": "message",
+                "role": "assistant",
+                "model": model_id,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+            }
+        # Llama-style prompt bodies; "choices" covers the DeepSeek/Marketplace shape.
+        return {
+            "generation": text,
+            "prompt_token_count": input_tokens,
+            "generation_token_count": output_tokens,
+            "stop_reason": "stop",
+            "choices": [{"text": text, "finish_reason": "stop"}],
+        }
+
+    def _invoke(self, model_id, request, started):
+        words = self.backend.answer_words(model_id)
+        time.sleep(self.backend.token_delay * len(words))
+        input_tokens = native_prompt_tokens(request)
+        self.backend.count("input_tokens", input_tokens)
+        self.backend.count("output_tokens", len(words))
+        self._send_json(
+            200,
+            self._native_response(model_id, request, "".join(words).strip(), input_tokens, len(words)),
+            {
+                "x-amzn-bedrock-input-token-count": str(input_tokens),
+                "x-amzn-bedrock-output-token-count": str(len(words)),
+                "x-amzn-bedrock-invocation-latency": str(int((time.perf_counter() - started) * 1000)),
+            },
+        )
+
+    def _invoke_stream(self, model_id, request, started):
+        words = self.backend.answer_words(model_id)
+        self.backend.count("input_tokens", native_prompt_tokens(request))
+        self.backend.count("output_tokens", len(words))
+        self._start_event_stream()
+        for chunk in invoke_stream_chunks(request, words):
+            time.sleep(self.backend.token_delay)
+            payload = {"bytes": base64.b64encode(json.dumps(chunk).encode("utf-8")).decode("ascii")}
+            self._send_chunk(encode_event("chunk", payload))
+        self._end_event_stream()
+
+    def _invoke_endpoint(self, endpoint_name, payload):
+        """SageMaker JumpStart chat container: OpenAI-style responses; a list payload is a batch."""
+        def completion(request):
+            words = self.backend.answer_words(endpoint_name)
+            input_tokens = estimate_tokens(request.get("messages", request.get("inputs", "")))
+            self.backend.count("input_tokens", input_tokens)
+            self.backend.count("output_tokens", len(words))
+            return {
+                "id": f"chatcmpl-{random.getrandbits(48):012x}",
+                "object": "chat.completion",
+                "model": endpoint_name,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(words).strip()},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": input_tokens, "completion_tokens": len(words),
+                          "total_tokens": input_tokens + len(words)},
+            }
+
+        time.sleep(self.backend.token_delay * self.backend.output_words)
+        if isinstance(payload, list):
+            self._send_json(200, [completion(request) for request in payload])
+        elif "inputs" in payload:
+            # Text generation (TGI) container shape, as sent by litellm's sagemaker/ models.
+            text = completion(payload)["choices"][0]["message"]["content"]
+            self._send_json(200, [{"generated_text": text}])
+        else:
+            self._send_json(200, completion(payload))
+
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0, **backend_options):
+    """
+    Start the stub on a background thread. Returns (server, endpoint_url).
+
+    Keyword arguments are StubBackend options (token_delay, output_words,
+    throttle_rate, requests_per_minute, script); server.backend.snapshot()
+    returns the counters.
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.backend = StubBackend(latency=latency, **backend_options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Bedrock/SageMaker Runtime stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="0",
+                        help="time to first token: SECONDS, uniform:LOW,HIGH, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds per generated output word")
+    parser.add_argument("--output-words", type=int, default=DEFAULT_OUTPUT_WORDS)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls throttled at random")
+    parser.add_argument("--requests-per-minute", type=int, default=None, help="simulated quota")
+    parser.add_argument("--script", help="JSON file with scripted responses (see StubBackend)")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    server, url = start_stub_server(
+        args.host, args.port, args.latency,
+        token_delay=args.token_delay,
+        output_words=args.output_words,
+        throttle_rate=args.throttle_rate,
+        requests_per_minute=args.requests_per_minute,
+        script=script,
+    )
+    print(f"Bedrock/SageMaker stub listening on {url}")
+    print(f"  export AWS_ENDPOINT_URL_BEDROCK_RUNTIME={url}")
+    print(f"  export AWS_ENDPOINT_URL_SAGEMAKER_RUNTIME={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Throughput of many concurrent conversations through the asyncio runtime.
+
+Runs against the local Bedrock stub (with simulated model latency):
+
+    python bench_async_agent.py --conversations 500 --concurrency 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from agent import build_converse_request
+from agent_tools import registry
+from async_agent import AsyncAgentRuntime
+from bedrock_clients import get_bedrock_client
+from bedrock_stub import start_stub_server
+
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated model latency in seconds")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "stub")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "stub")
+
+    server, url = start_stub_server(latency=args.latency)
+    client = get_bedrock_client(endpoint_url=url, max_pool_connections=args.concurrency)
+    runtime = AsyncAgentRuntime(client, max_concurrency=args.concurrency)
+    conversations = [
+        {
+            "message_list": [{"role": "user", "content": [{"text": f"Request {i}"}]}],
+            "build_request": lambda messages: build_converse_request(
+                MODEL_ID, "You are a helpful assistant", registry.tool_config, messages),
+            "tool_handler": registry.dispatch,
+        }
+        for i in range(args.conversations)
+    ]
+    try:
+        start = time.perf_counter()
+        results = asyncio.run(runtime.run_many(conversations))
+        elapsed = time.perf_counter() - start
+    finally:
+        runtime.close()
+        server.shutdown()
+
+    failures = sum(isinstance(result, Exception) for result in results)
+    print(f"{args.conversations} conversations, concurrency {args.concurrency}: "
+          f"{elapsed:.2f}s, {args.conversations / elapsed:.1f} conversations/s, {failures} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Micro-benchmark: per-turn latency of a fresh client per turn vs the shared client.
+
+Runs against the local Bedrock stub, so no AWS account is needed:
+
+    python bench_client_reuse.py --turns 50
+"""
+import argparse
+import os
+import statistics
+import time
+
+import boto3
+from bedrock_clients import get_bedrock_client
+from bedrock_stub import start_stub_server
+
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+MESSAGES = [{"role": "user", "content": [{"text": "hello"}]}]
+
+
+def per_turn_client(endpoint_url):
+    """The old pattern: new session and client on every turn."""
+    session = boto3.Session()
+    client = session.client("bedrock-runtime", region_name="us-east-1", endpoint_url=endpoint_url)
+    return client.converse(modelId=MODEL_ID, messages=MESSAGES)
+
+
+def shared_client(endpoint_url):
+    """The new pattern: one pooled client reused by every turn."""
+    client = get_bedrock_client(endpoint_url=endpoint_url)
+    return client.converse(modelId=MODEL_ID, messages=MESSAGES)
+
+
+def measure(fn, endpoint_url, turns):
+    timings = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn(endpoint_url)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<18} mean {statistics.mean(timings):8.2f} ms   "
+          f"p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    # The stub does not check signatures, but botocore still needs credentials.
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "stub")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "stub")
+
+    server, url = start_stub_server()
+    try:
+        # Warm up imports and botocore's loaders so both sides start even.
+        per_turn_client(url)
+        report("client per turn", measure(per_turn_client, url, args.turns))
+        report("shared client", measure(shared_client, url, args.turns))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
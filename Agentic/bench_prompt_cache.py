@@ -0,0 +1,60 @@
+"""Compare billed input tokens per turn with and without prompt cache checkpoints.
+
+Runs a multi-turn conversation against the local Bedrock stub, which
+simulates Bedrock's cache read/write accounting:
+
+    python bench_prompt_cache.py --turns 10
+"""
+import argparse
+import os
+
+from agent_tools import registry
+from bedrock_clients import get_bedrock_client
+from bedrock_stub import start_stub_server
+from prompt_cache import cache_usage, with_cache_points
+
+MODEL_ID = "anthropic.claude-3-7-sonnet-20250219-v1:0"
+SYSTEM_PROMPT = ("You are an AI assistant capable of creating Lambda functions and performing "
+                 "mathematical calculations. Use the provided tools when necessary. ") * 20
+
+
+def run_conversation(client, turns, use_cache_points):
+    """Return per-turn (input tokens, cache read tokens, cache write tokens)."""
+    messages = []
+    per_turn = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": [{"text": f"Question number {turn}: what is cos({turn})?"}]})
+        system, tool_config, request_messages = [{"text": SYSTEM_PROMPT}], registry.tool_config, messages
+        if use_cache_points:
+            system, tool_config, request_messages = with_cache_points(system, tool_config, messages)
+        response = client.converse(modelId=MODEL_ID, messages=request_messages,
+                                   system=system, toolConfig=tool_config)
+        messages.append(response["output"]["message"])
+        per_turn.append((response["usage"]["inputTokens"],) + cache_usage(response))
+    return per_turn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "stub")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "stub")
+
+    for use_cache_points in (False, True):
+        # A fresh stub per run so the second run starts with a cold prompt cache.
+        server, url = start_stub_server()
+        try:
+            per_turn = run_conversation(get_bedrock_client(endpoint_url=url), args.turns, use_cache_points)
+        finally:
+            server.shutdown()
+        label = "with cachePoint" if use_cache_points else "without cachePoint"
+        print(f"{label}:")
+        for turn, (input_tokens, read_tokens, write_tokens) in enumerate(per_turn, 1):
+            print(f"  turn {turn:2}: input {input_tokens:6}  cache read {read_tokens:6}  cache write {write_tokens:6}")
+        print(f"  total uncached input tokens: {sum(t[0] for t in per_turn)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""End-to-end benchmark of the agent scripts against the local Bedrock/SageMaker stub.
+
+Scenarios:
+    converse_basic          the two-turn conversation of 02.Converse-API-Basic.py
+    tool_loop               the Converse tool-use loop (the model calls the cosine tool once)
+    sagemaker_predictor     the JumpStart call through the sagemaker SDK's Predictor
+    sagemaker_direct        the same call through sagemaker_endpoint (04.SM-Agentic.py)
+    sagemaker_batched       the same call through micro_batch (concurrent calls are batched)
+    crew_write_article      Agentic-Crewai/Write-Article.py
+    crew_customer_support   Agentic-Crewai/L3/MultiAgent-CustomerSupport.py
+    crew_hedge_fund         Agentic-SM/01.HedgeFunAnalysis.py
+
+Each (scenario, concurrency) pair runs in a fresh child process, so its peak
+RSS is its own; crews run as whole scripts, so their latency is the full
+script run. Tokens sent per request come from the stub's counters. Results
+are saved as JSON (by default to Agentic/bench_results/, which git ignores);
+pass a previous file to --compare to see the changes.
+
+    python bench_suite.py --concurrency 1 8 32 --requests 64 --output bench.json
+    python bench_suite.py --scenarios converse_basic tool_loop --compare bench.json
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bedrock_stub import start_stub_server
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "bench_results")
+
+MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+ENDPOINT_NAME = "jumpstart-dft-deepseek-llm-r1-disti-20250401-105354"
+
+CREW_SCRIPTS = {
+    "crew_write_article": os.path.join(REPO_ROOT, "Agentic-Crewai", "Write-Article.py"),
+    "crew_customer_support": os.path.join(REPO_ROOT, "Agentic-Crewai", "L3", "MultiAgent-CustomerSupport.py"),
+    "crew_hedge_fund": os.path.join(REPO_ROOT, "Agentic-SM", "01.HedgeFunAnalysis.py"),
+}
+SCENARIOS = ["converse_basic", "tool_loop", "sagemaker_predictor", "sagemaker_direct", "sagemaker_batched"] + list(CREW_SCRIPTS)
+
+# Stub answers: the tool loop prompt makes the model call cosine once.
+STUB_SCRIPT = [{"match": "cosine of", "tool_use": {"name": "cosine", "input": {"x": 0.5}}}]
+
+# Metrics where a larger value is an improvement (for --compare).
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+
+class SkipScenario(Exception):
+    """The scenario cannot run in this environment (e.g. a missing package)."""
+
+
+def load_script(name, path):
+    """Import a script whose file name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def stub_stats(endpoint_url):
+    with urllib.request.urlopen(f"{endpoint_url}/stub/stats") as response:
+        return json.load(response)
+
+
+# Scenario setup: each returns a function running one request end to end.
+def setup_converse_basic():
+    from bedrock_clients import get_model_client
+
+    basic = load_script("converse_basic", os.path.join(HERE, "02.Converse-API-Basic.py"))
+    client = get_model_client("us-east-1")
+    system_prompts = [{"text": "You are an AI assistant capable of creating Lambda functions "
+                               "and performing mathematical calculations."}]
+
+    def run_once():
+        messages = [{"role": "user", "content": [{"text": "Create a lamda function for dynamic list in python"}]}]
+        for follow_up in ("Make it handle empty lists.", None):
+            response = basic.generate_conversation(client, MODEL_ID, system_prompts, messages, None)
+            messages.append(response["output"]["message"])
+            if follow_up:
+                messages.append({"role": "user", "content": [{"text": follow_up}]})
+    return run_once
+
+
+def setup_tool_loop():
+    import agent
+    from agent_tools import registry
+    from bedrock_clients import get_model_client
+
+    client = get_model_client("us-east-1")
+
+    def run_once():
+        message_list = [{"role": "user", "content": [{"text": "What is the cosine of 0.5?"}]}]
+        agent.run_agent_loop(
+            lambda messages: client.converse(**agent.build_converse_request(
+                MODEL_ID, "You are an assistant capable of creating responses",
+                registry.tool_config, messages)),
+            message_list,
+            registry.dispatch,
+        )
+    return run_once
+
+
+def setup_sagemaker_predictor():
+    payload = {"messages": [{"role": "user", "content": "what is 10+1."}], "max_tokens": 128}
+    try:
+        from sagemaker.deserializers import JSONDeserializer
+        from sagemaker.predictor import Predictor
+        from sagemaker.serializers import JSONSerializer
+    except ImportError:
+        raise SkipScenario("sagemaker is not installed")
+    # retrieve_default() looks the model up in the control plane, which the
+    # stub does not serve; this is the predictor it builds for the endpoint.
+    predictor = Predictor(ENDPOINT_NAME, serializer=JSONSerializer(), deserializer=JSONDeserializer())
+    return lambda: predictor.predict(payload)
+
+
+def direct_predictor():
+    from bedrock_clients import get_client
+    from sagemaker_endpoint import DEFAULT_ACCEPT, DEFAULT_CONTENT_TYPE, EndpointPredictor
+
+    # The metadata resolve_endpoint() would cache for the endpoint.
+    endpoint = {"endpoint_name": ENDPOINT_NAME, "region": "us-east-1",
+                "content_type": DEFAULT_CONTENT_TYPE, "accept": DEFAULT_ACCEPT}
+    return EndpointPredictor(endpoint, get_client("sagemaker-runtime"), cache_path=None)
+
+
+def setup_sagemaker_direct():
+    payload = {"messages": [{"role": "user", "content": "what is 10+1."}], "max_tokens": 128}
+    predictor = direct_predictor()
+    return lambda: predictor.predict(payload)
+
+
+def setup_sagemaker_batched():
+    from micro_batch import BatchingPredictor
+
+    payload = {"messages": [{"role": "user", "content": "what is 10+1."}], "max_tokens": 128}
+    predictor = BatchingPredictor(direct_predictor())
+    return lambda: predictor.predict(payload)
+
+
+def setup_crew(scenario):
+    if importlib.util.find_spec("crewai") is None:
+        raise SkipScenario("crewai is not installed")
+    script = CREW_SCRIPTS[scenario]
+
+    def run_once():
+        with tempfile.TemporaryDirectory() as workdir:
+            # Scripts run in a scratch directory, as some of them write files.
+            subprocess.run([sys.executable, script], cwd=workdir, check=True,
+                           stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return run_once
+
+
+def setup_scenario(scenario):
+    if scenario in CREW_SCRIPTS:
+        return setup_crew(scenario)
+    return globals()[f"setup_{scenario}"]()
+
+
+def run_child(scenario, concurrency, requests, endpoint_url, result_path):
+    """Run one scenario at one concurrency level in this process and write its result."""
+    logging.disable(logging.INFO)
+    result = {"scenario": scenario, "concurrency": concurrency, "requests": requests}
+    try:
+        run_once = setup_scenario(scenario)
+    except SkipScenario as e:
+        result["skipped"] = str(e)
+        with open(result_path, "w") as f:
+            json.dump(result, f)
+        return
+
+    # One untimed warm-up request loads lazy imports and opens connections.
+    run_once()
+    before = stub_stats(endpoint_url)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def timed_request(_):
+        start = time.perf_counter()
+        try:
+            run_once()
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed_request, range(requests)))
+    wall = time.perf_counter() - start
+    after = stub_stats(endpoint_url)
+
+    def delta(key):
+        return after.get(key, 0) - before.get(key, 0)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    result.update({
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2),
+        "latency_ms": {f"p{q}": round(percentile(latencies, q), 2) if latencies else None
+                       for q in (50, 90, 95, 99)},
+        "model_calls_per_request": round(delta("requests") / requests, 2),
+        "tokens_sent_per_request": round(delta("input_tokens") / requests, 1),
+        "bytes_sent_per_request": round(delta("request_bytes") / requests, 1),
+        "peak_rss_mb": round(peak_rss * rss_unit / 2 ** 20, 1),
+    })
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+
+
+def child_env(endpoint_url):
+    env = dict(os.environ)
+    env.update({
+        "AWS_ENDPOINT_URL_BEDROCK_RUNTIME": endpoint_url,
+        "AWS_ENDPOINT_URL_SAGEMAKER_RUNTIME": endpoint_url,
+        # litellm (used by the CrewAI LLMs) reads its own endpoint variables.
+        "AWS_BEDROCK_RUNTIME_ENDPOINT": endpoint_url,
+        "AWS_SAGEMAKER_RUNTIME_ENDPOINT": endpoint_url,
+        "AWS_DEFAULT_REGION": env.get("AWS_DEFAULT_REGION", "us-east-1"),
+        "AWS_ACCESS_KEY_ID": env.get("AWS_ACCESS_KEY_ID", "stub"),
+        "AWS_SECRET_ACCESS_KEY": env.get("AWS_SECRET_ACCESS_KEY", "stub"),
+    })
+    # Measure the model path, not the response cache.
+    env.pop("BEDROCK_CACHE_PATH", None)
+    return env
+
+
+def run_scenario(scenario, concurrency, requests, endpoint_url):
+    """Run one (scenario, concurrency) pair in a child process and return its result."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = os.path.join(tmp, "result.json")
+        command = [sys.executable, os.path.abspath(__file__), "--child", scenario,
+                   "--concurrency", str(concurrency), "--requests", str(requests),
+                   "--endpoint-url", endpoint_url, "--result-path", result_path]
+        completed = subprocess.run(command, cwd=HERE, env=child_env(endpoint_url),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            return {"scenario": scenario, "concurrency": concurrency, "requests": requests,
+                    "failed": completed.stderr.strip().splitlines()[-1:] or ["no output"]}
+        with open(result_path) as f:
+            return json.load(f)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result):
+    label = f"{result['scenario']:<22} c={result['concurrency']:<4}"
+    if "skipped" in result:
+        print(f"{label} skipped: {result['skipped']}")
+    elif "failed" in result:
+        print(f"{label} failed: {result['failed'][0]}")
+    else:
+        latency = result["latency_ms"]
+        print(f"{label} {result['throughput_rps']:>8.1f} req/s  p50 {latency['p50']:>8.1f} ms  "
+              f"p99 {latency['p99']:>8.1f} ms  {result['tokens_sent_per_request']:>8.0f} tok/req  "
+              f"{result['peak_rss_mb']:>6.0f} MB  {result['errors']} errors")
+
+
+def compare(results, baseline_path):
+    """Print the relative change of each metric against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["results"] if "throughput_rps" in r}
+    print(f"\nChange vs {baseline_path} (commit {baseline.get('commit')}), + is better:")
+    for result in results:
+        old = previous.get((result["scenario"], result["concurrency"]))
+        if old is None or "throughput_rps" not in result:
+            continue
+        changes = []
+        for name, new_value, old_value in (
+            ("throughput_rps", result["throughput_rps"], old["throughput_rps"]),
+            ("p50", result["latency_ms"]["p50"], old["latency_ms"]["p50"]),
+            ("p99", result["latency_ms"]["p99"], old["latency_ms"]["p99"]),
+            ("tokens_sent_per_request", result["tokens_sent_per_request"], old["tokens_sent_per_request"]),
+            ("peak_rss_mb", result["peak_rss_mb"], old["peak_rss_mb"]),
+        ):
+            if not old_value:
+                continue
+            change = (new_value - old_value) / old_value * 100
+            if name not in HIGHER_IS_BETTER:
+                change = -change
+            changes.append(f"{name} {change:+.1f}%")
+        print(f"  {result['scenario']:<22} c={result['concurrency']:<4} " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="requests per scenario and concurrency level")
+    parser.add_argument("--latency", default="0.05", help="stub latency spec (see bedrock_stub.parse_latency)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stub seconds per output word")
+    parser.add_argument("--output", help="results file (default: bench_results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    # Internal: run a single scenario in this process.
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--endpoint-url", help=argparse.SUPPRESS)
+    parser.add_argument("--result-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.concurrency[0], args.requests, args.endpoint_url, args.result_path)
+        return
+
+    server, url = start_stub_server(latency=args.latency, token_delay=args.token_delay, script=STUB_SCRIPT)
+    results = []
+    try:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                result = run_scenario(scenario, concurrency, args.requests, url)
+                print_result(result)
+                results.append(result)
+                if "skipped" in result:
+                    break
+    finally:
+        server.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"requests": args.requests, "latency": args.latency, "token_delay": args.token_delay},
+        "results": results,
+    }
+    if args.output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        args.output = os.path.join(RESULTS_DIR, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Hedged Bedrock requests across regions, with throttle-aware traffic shifting.
+
+HedgedClient holds a model client per configured region (or cross-region
+inference profile). Each converse/invoke_model call goes to a primary
+region picked by health weight. If it has not answered by that region's
+hedge threshold (a percentile of its recent latencies), a duplicate goes to
+a second region and whichever answers first wins. The other call cannot be
+cancelled mid-flight; its result is discarded (and its body closed).
+A throttled region fails over at once, has its weight cut and sits out a
+short cooldown, so traffic shifts to the healthy regions and drifts back as
+calls succeed.
+
+    client = hedged_client(["us-east-1", "us-west-2"])
+    response = client.converse(modelId=..., messages=...)
+
+Set BEDROCK_REGIONS=us-east-1,us-west-2 to configure the default regions;
+with more than one region there, get_model_client() (and so every script)
+returns a hedged client.
+Every region uses its own rate limiter, so a throttle in one region does
+not pause the others.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from bedrock_clients import get_model_client
+from botocore.exceptions import ClientError, ConnectionError, ReadTimeoutError
+from rate_limit import RateLimiter, is_throttling_error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGIONS = ("us-east-1", "us-west-2")
+HEDGE_PERCENTILE = 95
+# Hedge threshold used until a region has MIN_SAMPLES observed latencies.
+INITIAL_HEDGE_DELAY_MS = 3000.0
+MIN_HEDGE_DELAY_MS = 50.0
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+THROTTLE_COOLDOWN = 5.0
+MIN_WEIGHT = 0.05
+
+
+# Server-side failures worth trying in another region (throttling is handled separately).
+RETRYABLE_ERROR_CODES = {"InternalServerException", "ModelTimeoutException", "ModelErrorException"}
+
+
+def is_retryable_error(error):
+    """True for errors another region may not have (server faults, timeouts, connection errors)."""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+    return isinstance(error, (ConnectionError, ReadTimeoutError))
+
+
+class RegionState:
+    """Recent latencies, health weight and cooldown of one region."""
+
+    def __init__(self, region_name, client, weight=1.0):
+        self.region_name = region_name
+        self.client = client
+        self.max_weight = weight
+        self.weight = weight
+        self.cooldown_until = 0.0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def hedge_delay_ms(self, percentile=HEDGE_PERCENTILE):
+        if len(self.latencies_ms) < MIN_SAMPLES:
+            return INITIAL_HEDGE_DELAY_MS
+        ordered = sorted(self.latencies_ms)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return max(MIN_HEDGE_DELAY_MS, ordered[index])
+
+
+class HedgedClient:
+    """
+    Send converse/invoke_model calls to the healthiest region, hedging slow
+    calls to a second region. Other attributes come from the first region's client.
+    """
+
+    def __init__(self, clients, model_ids=None, weights=None, hedge_percentile=HEDGE_PERCENTILE, max_workers=64):
+        """
+        Args:
+            clients (dict): region name -> model client, in order of preference
+            model_ids (dict): region name -> {model id: regional model id or
+                inference profile}, for models whose id differs per region
+            weights (dict): region name -> initial share of primary traffic
+            hedge_percentile (float): latency percentile after which a call is hedged
+            max_workers (int): threads for in-flight calls (two per hedged call)
+        """
+        self.regions = [
+            RegionState(region_name, client, (weights or {}).get(region_name, 1.0))
+            for region_name, client in clients.items()
+        ]
+        self.model_ids = model_ids or {}
+        self.hedge_percentile = hedge_percentile
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "throttles": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.regions[0].client, name)
+
+    def _pick(self, exclude=(), ready_only=False):
+        """
+        Weighted random choice among regions not excluded, preferring ones not
+        cooling down. With ready_only, regions cooling down are never picked.
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [region for region in self.regions if region not in exclude]
+            ready = [region for region in candidates if region.cooldown_until <= now]
+            if not ready and not ready_only:
+                ready = candidates
+            if not ready:
+                return None
+            return random.choices(ready, weights=[region.weight for region in ready])[0]
+
+    def _record_success(self, region, latency_ms):
+        with self._lock:
+            region.latencies_ms.append(latency_ms)
+            region.weight = min(region.max_weight, region.weight + 0.05 * region.max_weight)
+
+    def _record_throttle(self, region):
+        with self._lock:
+            self.stats["throttles"] += 1
+            region.weight = max(MIN_WEIGHT * region.max_weight, region.weight * 0.5)
+            region.cooldown_until = time.monotonic() + THROTTLE_COOLDOWN
+        logger.warning("Throttled in %s, shifting traffic away for %.0fs", region.region_name, THROTTLE_COOLDOWN)
+
+    def _invoke(self, region, operation, request):
+        """Run one call in a region; returns (region, response, latency_ms)."""
+        request = dict(request)
+        model_id = request.get("modelId")
+        request["modelId"] = self.model_ids.get(region.region_name, {}).get(model_id, model_id)
+        start = time.perf_counter()
+        response = getattr(region.client, operation)(**request)
+        latency_ms = (time.perf_counter() - start) * 1000
+        self._record_success(region, latency_ms)
+        return region, response, latency_ms
+
+    def _submit(self, region, operation, request, kind):
+        future = self._executor.submit(self._invoke, region, operation, request)
+        future.region = region
+        future.kind = kind
+        return future
+
+    def _discard(self, future):
+        """Close the body of a losing invoke_model call once it finishes."""
+        def close(done):
+            if not done.cancelled() and done.exception() is None:
+                body = done.result()[1].get("body")
+                if body is not None and hasattr(body, "close"):
+                    body.close()
+        future.add_done_callback(close)
+
+    def _call(self, operation, request):
+        with self._lock:
+            self.stats["calls"] += 1
+        primary = self._pick()
+        tried = [primary]
+        pending = {self._submit(primary, operation, request, "primary")}
+        hedge_at = time.monotonic() + primary.hedge_delay_ms(self.hedge_percentile) / 1000
+        last_error = None
+
+        while pending:
+            can_add = len(tried) < len(self.regions)
+            timeout = max(0.0, hedge_at - time.monotonic()) if can_add and hedge_at is not None else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    region, response, _ = future.result()
+                    for other in pending:
+                        self._discard(other)
+                    if future.kind != "primary":
+                        with self._lock:
+                            self.stats["hedge_wins" if future.kind == "hedge" else "failovers"] += 1
+                    response["region"] = region.region_name
+                    return response
+                if is_throttling_error(error):
+                    self._record_throttle(future.region)
+                elif not is_retryable_error(error):
+                    # A bad request fails the same way in every region.
+                    for other in pending:
+                        self._discard(other)
+                    raise error
+                last_error = error
+
+            # A failed call fails over at once; a slow one is hedged at its threshold.
+            if can_add and (done or (hedge_at is not None and time.monotonic() >= hedge_at)):
+                kind = "failover" if done else "hedge"
+                # Hedges only go to healthy regions; a failover takes any region left.
+                next_region = self._pick(exclude=tried, ready_only=kind == "hedge")
+                if next_region is None:
+                    # Every other region is cooling down: wait for the calls in flight.
+                    hedge_at = None
+                    continue
+                if kind == "hedge":
+                    with self._lock:
+                        self.stats["hedged"] += 1
+                logger.info("%s %s call to %s", "Hedging" if kind == "hedge" else "Failing over",
+                            operation, next_region.region_name)
+                tried.append(next_region)
+                pending.add(self._submit(next_region, operation, request, kind))
+                hedge_at = time.monotonic() + next_region.hedge_delay_ms(self.hedge_percentile) / 1000
+        raise last_error
+
+    def converse(self, **request):
+        return self._call("converse", request)
+
+    def invoke_model(self, **request):
+        return self._call("invoke_model", request)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def hedged_client(regions=None, model_ids=None, weights=None, hedge_percentile=HEDGE_PERCENTILE, **kwargs):
+    """
+    Return a HedgedClient over the shared model client of each region.
+
+    regions defaults to BEDROCK_REGIONS (comma separated) or us-east-1,us-west-2.
+    Throttled calls are not retried inside a region; they fail over instead.
+    """
+    if regions is None:
+        regions = [r.strip() for r in os.getenv("BEDROCK_REGIONS", ",".join(DEFAULT_REGIONS)).split(",") if r.strip()]
+    clients = {
+        region_name: get_model_client(region_name, throttle_attempts=1, limiter=RateLimiter(), hedge=False, **kwargs)
+        for region_name in regions
+    }
+    return HedgedClient(clients, model_ids, weights, hedge_percentile)
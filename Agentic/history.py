@@ -0,0 +1,114 @@
+"""Token-budgeted conversation history for the Converse scripts.
+
+Without compaction every turn re-sends every earlier message and tool result,
+so input tokens grow linearly with the length of the session. HistoryManager
+keeps what is sent under a token budget by dropping (or summarizing) the
+oldest turns. A turn starts at a user message that is not a toolResult, so
+toolUse/toolResult pairs are always kept or dropped together.
+"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 8000
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(message):
+    """Rough token estimate of one Converse message (~4 characters per token)."""
+    chars = 0
+    for block in message["content"]:
+        if "text" in block:
+            chars += len(block["text"])
+        elif "toolUse" in block:
+            chars += len(block["toolUse"]["name"]) + len(json.dumps(block["toolUse"].get("input", {})))
+        elif "toolResult" in block:
+            chars += len(json.dumps(block["toolResult"]["content"]))
+        elif "cachePoint" not in block:
+            chars += len(json.dumps(block, default=str))
+    return chars // CHARS_PER_TOKEN + 4
+
+
+def is_turn_start(message):
+    """True for a user message that starts a new turn (not a toolResult reply)."""
+    return message["role"] == "user" and not any("toolResult" in block for block in message["content"])
+
+
+def extractive_summary(messages, max_chars=1000):
+    """Cheap local summary of dropped messages: the opening of each text block."""
+    lines = []
+    for message in messages:
+        for block in message["content"]:
+            if "text" in block and block["text"].strip():
+                first_line = block["text"].strip().splitlines()[0]
+                lines.append(f"{message['role']}: {first_line[:200]}")
+            elif "toolUse" in block:
+                lines.append(f"assistant used tool {block['toolUse']['name']}")
+    return "\n".join(lines)[-max_chars:]
+
+
+class HistoryManager:
+    """
+    Compact one conversation's history to a token budget.
+
+    The manager is stateful per conversation: once older turns have been cut
+    they stay cut, and it trims down to low_watermark * max_tokens so the
+    sent prefix stays stable for several turns (which keeps prompt cache hits).
+    """
+
+    def __init__(self, max_tokens=DEFAULT_MAX_TOKENS, low_watermark=0.75,
+                 keep_last_turns=1, summarizer=None):
+        """
+        Args:
+            max_tokens (int): token budget for the messages sent each turn
+            low_watermark (float): fraction of max_tokens to trim down to
+            keep_last_turns (int): most recent turns that are never dropped
+            summarizer (callable): optional, takes the dropped messages and
+                returns a text summary that is prepended to the kept history;
+                None simply drops them. The summary is truncated to an eighth
+                of the budget, which is reserved for it.
+        """
+        self.max_tokens = max_tokens
+        self.low_watermark = low_watermark
+        self.keep_last_turns = keep_last_turns
+        self.summarizer = summarizer
+        self.summary_tokens = max_tokens // 8 if summarizer else 0
+        self._start = 0
+        self._summary = None
+
+    def compact(self, messages):
+        """Return the messages to send this turn; the caller's list is not modified."""
+        kept = messages[self._start:]
+        sizes = [estimate_tokens(message) for message in kept]
+        if sum(sizes) > self.max_tokens - self.summary_tokens:
+            self._drop_old_turns(messages, kept, sizes)
+            kept = messages[self._start:]
+
+        if self._summary:
+            first = dict(kept[0])
+            first["content"] = [{"text": f"Summary of the earlier conversation:\n{self._summary}"}] + list(first["content"])
+            kept = [first] + kept[1:]
+        return kept
+
+    def _drop_old_turns(self, messages, kept, sizes):
+        turn_starts = [i for i, message in enumerate(kept) if is_turn_start(message)]
+        # Never cut into the most recent turns.
+        candidates = turn_starts[1:len(turn_starts) - self.keep_last_turns + 1]
+        target = self.max_tokens * self.low_watermark - self.summary_tokens
+        total = sum(sizes)
+        cut = 0
+        for start in candidates:
+            if total <= target:
+                break
+            total -= sum(sizes[cut:start])
+            cut = start
+        if not cut:
+            logger.warning("History is over budget but the recent turns cannot be dropped")
+            return
+
+        dropped = messages[:self._start + cut]
+        self._start += cut
+        logger.info("Compacted history: dropped %d message(s), ~%d tokens kept", cut, total)
+        if self.summarizer:
+            self._summary = self.summarizer(dropped)[-self.summary_tokens * CHARS_PER_TOKEN:]
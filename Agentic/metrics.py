@@ -0,0 +1,375 @@
+"""In-process metrics for model calls.
+
+MeteredClient wraps a Bedrock Runtime client and records, for every call:
+wall time, time to first byte, input/output/total tokens, stop reason,
+model id and retry count. Values go into fixed-bucket histograms (one
+bisect and a few additions per call), so it is cheap enough to leave on.
+
+Metrics can be exported as JSON or Prometheus text, and the scripts print
+a p50/p95/p99 and tokens/sec summary at exit. Set BEDROCK_METRICS_PATH to
+also write them to a file at exit (*.prom for Prometheus text, else JSON).
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds, roughly log-spaced.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 40000, 80000, 160000)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 1000)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and interpolated percentiles."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Estimate the q-th percentile (0-100) by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "max": round(self.max, 3),
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class CallMetrics:
+    """Histograms and counters for one (operation, model id) pair."""
+
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.ttfb_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.input_tokens = Histogram(TOKEN_BUCKETS)
+        self.output_tokens = Histogram(TOKEN_BUCKETS)
+        self.output_tokens_per_sec = Histogram(RATE_BUCKETS)
+        self.total_tokens = 0
+        self.retries = 0
+        self.errors = defaultdict(int)
+        self.stop_reasons = defaultdict(int)
+
+    def to_dict(self):
+        return {
+            "latency_ms": self.latency_ms.to_dict(),
+            "ttfb_ms": self.ttfb_ms.to_dict(),
+            "input_tokens": self.input_tokens.to_dict(),
+            "output_tokens": self.output_tokens.to_dict(),
+            "output_tokens_per_sec": self.output_tokens_per_sec.to_dict(),
+            "total_tokens": self.total_tokens,
+            "retries": self.retries,
+            "errors": dict(self.errors),
+            "stop_reasons": dict(self.stop_reasons),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe collection of CallMetrics keyed by (operation, model id)."""
+
+    def __init__(self):
+        self._calls = defaultdict(CallMetrics)
+        self._lock = threading.Lock()
+
+    def record_call(self, operation, model_id, wall_ms, ttfb_ms=None, input_tokens=0,
+                    output_tokens=0, total_tokens=None, stop_reason=None, retries=0):
+        """Record one successful model call."""
+        with self._lock:
+            metrics = self._calls[(operation, model_id)]
+            metrics.latency_ms.observe(wall_ms)
+            metrics.ttfb_ms.observe(wall_ms if ttfb_ms is None else ttfb_ms)
+            metrics.input_tokens.observe(input_tokens)
+            metrics.output_tokens.observe(output_tokens)
+            if output_tokens and wall_ms:
+                metrics.output_tokens_per_sec.observe(output_tokens / (wall_ms / 1000))
+            metrics.total_tokens += total_tokens if total_tokens is not None else input_tokens + output_tokens
+            metrics.retries += retries
+            if stop_reason:
+                metrics.stop_reasons[stop_reason] += 1
+
+    def record_error(self, operation, model_id, error_code, retries=0):
+        """Record a failed model call."""
+        with self._lock:
+            metrics = self._calls[(operation, model_id)]
+            metrics.errors[error_code] += 1
+            metrics.retries += retries
+
+    def record_retry(self, operation, model_id):
+        """Count a retry made above the SDK (e.g. by the rate limiter)."""
+        with self._lock:
+            self._calls[(operation, model_id)].retries += 1
+
+    def to_dict(self):
+        with self._lock:
+            return [
+                {"operation": operation, "model_id": model_id, **metrics.to_dict()}
+                for (operation, model_id), metrics in sorted(self._calls.items())
+            ]
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        histograms = (
+            ("bedrock_call_latency_ms", "latency_ms", "Wall time of model calls in milliseconds"),
+            ("bedrock_call_ttfb_ms", "ttfb_ms", "Time to first byte of model calls in milliseconds"),
+            ("bedrock_call_input_tokens", "input_tokens", "Input tokens per model call"),
+            ("bedrock_call_output_tokens", "output_tokens", "Output tokens per model call"),
+            ("bedrock_call_output_tokens_per_sec", "output_tokens_per_sec", "Output tokens per second per model call"),
+        )
+        with self._lock:
+            items = sorted(self._calls.items())
+            for name, attribute, help_text in histograms:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (operation, model_id), metrics in items:
+                    labels = f'operation="{operation}",model_id="{model_id}"'
+                    histogram = getattr(metrics, attribute)
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            lines.append("# HELP bedrock_tokens_total Total tokens used by model calls")
+            lines.append("# TYPE bedrock_tokens_total counter")
+            for (operation, model_id), metrics in items:
+                lines.append(f'bedrock_tokens_total{{operation="{operation}",model_id="{model_id}"}} {metrics.total_tokens}')
+            lines.append("# HELP bedrock_retries_total Retry attempts made by model calls")
+            lines.append("# TYPE bedrock_retries_total counter")
+            for (operation, model_id), metrics in items:
+                lines.append(f'bedrock_retries_total{{operation="{operation}",model_id="{model_id}"}} {metrics.retries}')
+            lines.append("# HELP bedrock_calls_total Completed model calls by stop reason")
+            lines.append("# TYPE bedrock_calls_total counter")
+            for (operation, model_id), metrics in items:
+                for stop_reason, count in sorted(metrics.stop_reasons.items()):
+                    lines.append(f'bedrock_calls_total{{operation="{operation}",model_id="{model_id}",'
+                                 f'stop_reason="{stop_reason}"}} {count}')
+            lines.append("# HELP bedrock_errors_total Failed model calls by error code")
+            lines.append("# TYPE bedrock_errors_total counter")
+            for (operation, model_id), metrics in items:
+                for error_code, count in sorted(metrics.errors.items()):
+                    lines.append(f'bedrock_errors_total{{operation="{operation}",model_id="{model_id}",'
+                                 f'error="{error_code}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Human-readable per-model summary: latency percentiles, tokens and tokens/sec."""
+        lines = []
+        for entry in self.to_dict():
+            latency = entry["latency_ms"]
+            if not latency["count"] and not entry["errors"]:
+                continue
+            lines.append(
+                f"{entry['operation']} {entry['model_id']}: {latency['count']} calls, "
+                f"latency p50 {latency['p50']:.0f} ms / p95 {latency['p95']:.0f} ms / p99 {latency['p99']:.0f} ms, "
+                f"ttfb p50 {entry['ttfb_ms']['p50']:.0f} ms, "
+                f"{entry['total_tokens']} tokens, "
+                f"{entry['output_tokens_per_sec']['p50']:.1f} output tokens/sec (p50), "
+                f"{entry['retries']} retries, errors {entry['errors'] or 0}"
+            )
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Write the metrics to path: Prometheus text for *.prom, JSON otherwise."""
+        with open(path, "w") as f:
+            f.write(self.to_prometheus() if path.endswith(".prom") else self.to_json())
+
+
+METRICS = MetricsRegistry()
+
+
+def _error_code(error):
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") or type(error).__name__
+
+
+def _retries(response):
+    return response.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+
+
+class _MeteredStream:
+    """Iterate a converse_stream (or native response) event stream, recording the call when it ends."""
+
+    def __init__(self, stream, on_done, start):
+        """start is the perf_counter() reading taken before the request was sent."""
+        self._stream = stream
+        self._on_done = on_done
+        self._start = start
+        self._first_event_at = None
+        self._usage = {}
+        self._stop_reason = None
+
+    def __iter__(self):
+        for event in self._stream:
+            if self._first_event_at is None and "messageStart" not in event:
+                self._first_event_at = time.perf_counter()
+            if "messageStop" in event:
+                self._stop_reason = event["messageStop"].get("stopReason")
+            elif "metadata" in event:
+                self._usage = event["metadata"].get("usage", {})
+            elif "chunk" in event and b"amazon-bedrock-invocationMetrics" in event["chunk"]["bytes"]:
+                # Native streams report the token counts on their last chunk.
+                invocation = json.loads(event["chunk"]["bytes"])["amazon-bedrock-invocationMetrics"]
+                self._usage = {
+                    "inputTokens": invocation.get("inputTokenCount", 0),
+                    "outputTokens": invocation.get("outputTokenCount", 0),
+                }
+            yield event
+        end = time.perf_counter()
+        self._on_done(
+            wall_ms=(end - self._start) * 1000,
+            ttfb_ms=((self._first_event_at or end) - self._start) * 1000,
+            usage=self._usage,
+            stop_reason=self._stop_reason,
+        )
+
+
+class MeteredClient:
+    """
+    Wrap a Bedrock Runtime client and record metrics for converse, converse_stream,
+    invoke_model and invoke_model_with_response_stream. Every other attribute is
+    passed through to the wrapped client.
+    """
+
+    def __init__(self, client, registry=METRICS):
+        self._client = client
+        self.registry = registry
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _call(self, operation, model_id, **request):
+        start = time.perf_counter()
+        try:
+            response = getattr(self._client, operation)(**request)
+        except Exception as e:
+            self.registry.record_error(operation, model_id, _error_code(e))
+            raise
+        return response, (time.perf_counter() - start) * 1000
+
+    def converse(self, **request):
+        model_id = request.get("modelId")
+        response, wall_ms = self._call("converse", model_id, **request)
+        usage = response.get("usage", {})
+        self.registry.record_call(
+            "converse", model_id, wall_ms,
+            input_tokens=usage.get("inputTokens", 0),
+            output_tokens=usage.get("outputTokens", 0),
+            total_tokens=usage.get("totalTokens"),
+            stop_reason=response.get("stopReason"),
+            retries=_retries(response),
+        )
+        return response
+
+    def converse_stream(self, **request):
+        model_id = request.get("modelId")
+        # Timed from before the request, so wall time and TTFB include the round trip.
+        start = time.perf_counter()
+        response, _ = self._call("converse_stream", model_id, **request)
+        retries = _retries(response)
+
+        def on_done(wall_ms, ttfb_ms, usage, stop_reason):
+            self.registry.record_call(
+                "converse_stream", model_id, wall_ms, ttfb_ms,
+                input_tokens=usage.get("inputTokens", 0),
+                output_tokens=usage.get("outputTokens", 0),
+                total_tokens=usage.get("totalTokens"),
+                stop_reason=stop_reason,
+                retries=retries,
+            )
+
+        return dict(response, stream=_MeteredStream(response["stream"], on_done, start))
+
+    def invoke_model(self, **request):
+        model_id = request.get("modelId")
+        response, wall_ms = self._call("invoke_model", model_id, **request)
+        headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+        self.registry.record_call(
+            "invoke_model", model_id, wall_ms,
+            input_tokens=int(headers.get("x-amzn-bedrock-input-token-count", 0)),
+            output_tokens=int(headers.get("x-amzn-bedrock-output-token-count", 0)),
+            retries=_retries(response),
+        )
+        return response
+
+    def invoke_model_with_response_stream(self, **request):
+        model_id = request.get("modelId")
+        # Timed from before the request, so wall time and TTFB include the round trip.
+        start = time.perf_counter()
+        response, _ = self._call("invoke_model_with_response_stream", model_id, **request)
+        retries = _retries(response)
+
+        def on_done(wall_ms, ttfb_ms, usage, stop_reason):
+            self.registry.record_call(
+                "invoke_model_with_response_stream", model_id, wall_ms, ttfb_ms,
+                input_tokens=usage.get("inputTokens", 0),
+                output_tokens=usage.get("outputTokens", 0),
+                retries=retries,
+            )
+
+        return dict(response, body=_MeteredStream(response["body"], on_done, start))
+
+
+def metered(client, registry=METRICS):
+    """Wrap a client so its model calls are recorded in registry."""
+    return MeteredClient(client, registry)
+
+
+_exit_hook_installed = False
+
+
+def report_at_exit(registry=METRICS):
+    """Print the summary (and write BEDROCK_METRICS_PATH if set) when the process exits."""
+    global _exit_hook_installed
+    if _exit_hook_installed:
+        return
+    _exit_hook_installed = True
+
+    def report():
+        summary = registry.summary()
+        if summary:
+            print("\nModel call metrics:")
+            print(summary)
+        path = os.getenv("BEDROCK_METRICS_PATH")
+        if path:
+            registry.write(path)
+            logger.info("Wrote metrics to %s", path)
+
+    atexit.register(report)
@@ -0,0 +1,180 @@
+"""Client-side micro-batching of SageMaker endpoint calls.
+
+BatchingPredictor sits in front of an EndpointPredictor and is shared by
+every caller in the process. predict() queues the payload and blocks; a
+dispatcher thread collects the requests that arrive within a short window
+(or until the batch is full) and sends them together:
+
+- batched: one invoke_endpoint call with the list of payloads, for
+  containers that answer a list with a list (one response per payload);
+- pipelined: one call per payload, all in flight at the same time.
+
+Each caller gets back its own response (or its own error). Batching is
+tried first unless turned off; if the container rejects a list or does not
+answer with one response per payload, that batch is resent pipelined.
+After MAX_BATCH_MISMATCHES such batches in a row, batching stays off for
+this predictor.
+
+    predictor = batching_predictor("jumpstart-dft-deepseek-llm-r1-disti-20250408-101531")
+    response = predictor.predict({"messages": [...], "max_tokens": 128})
+    responses = predictor.predict_many([payload_1, payload_2, payload_3])
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from sagemaker_endpoint import ENDPOINT_CACHE_PATH, get_predictor
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 8
+MAX_WAIT_MS = 10.0
+MAX_IN_FLIGHT = 8
+# Errors meaning the container cannot take a list payload (rather than a failed call).
+UNBATCHABLE_ERROR_CODES = {"ModelError", "ValidationError"}
+# Rejected batches in a row before batching is turned off (one bad payload can fail a batch).
+MAX_BATCH_MISMATCHES = 3
+
+
+class BatchingPredictor:
+    """Coalesce concurrent predict() calls into batched or pipelined endpoint calls."""
+
+    def __init__(self, predictor, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 max_in_flight=MAX_IN_FLIGHT, batch_payloads=True):
+        """
+        Args:
+            predictor: object with predict(payload), e.g. an EndpointPredictor
+            max_batch_size (int): most requests sent together
+            max_wait_ms (float): how long the first request of a batch waits for others
+            max_in_flight (int): endpoint calls running at the same time
+            batch_payloads (bool): send a batch as one list payload (False: pipeline it)
+        """
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_payloads = batch_payloads
+        self.stats = {"requests": 0, "batches": 0, "batched_calls": 0, "pipelined_calls": 0}
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="batch")
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batch_mismatches = 0
+        self._dispatcher = threading.Thread(target=self._dispatch, name="batch-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def __getattr__(self, name):
+        return getattr(self.predictor, name)
+
+    def submit(self, payload):
+        """Queue a payload; returns a Future for its response."""
+        future = Future()
+        # Checked and queued under the lock close() takes, so nothing lands behind its sentinel.
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchingPredictor is closed")
+            self.stats["requests"] += 1
+            self._queue.put((payload, future))
+        return future
+
+    def predict(self, payload):
+        """Send payload with whatever else is queued and return its response."""
+        return self.submit(payload).result()
+
+    def predict_many(self, payloads):
+        """Send several payloads at once; responses come back in the same order."""
+        futures = [self.submit(payload) for payload in payloads]
+        return [future.result() for future in futures]
+
+    def _collect(self, first):
+        """Gather requests arriving within max_wait_ms of the first, up to max_batch_size."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _dispatch(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            with self._lock:
+                self.stats["batches"] += 1
+            if self.batch_payloads and len(batch) > 1:
+                self._executor.submit(self._send_batched, batch)
+            else:
+                self._send_pipelined(batch)
+
+    def _send_one(self, payload, future):
+        with self._lock:
+            self.stats["pipelined_calls"] += 1
+        try:
+            future.set_result(self.predictor.predict(payload))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _send_pipelined(self, batch):
+        for payload, future in batch:
+            self._executor.submit(self._send_one, payload, future)
+
+    def _send_batched(self, batch):
+        with self._lock:
+            self.stats["batched_calls"] += 1
+        try:
+            responses = self.predictor.predict([payload for payload, _ in batch])
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in UNBATCHABLE_ERROR_CODES:
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            responses = None
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        if not isinstance(responses, list) or len(responses) != len(batch):
+            with self._lock:
+                self._batch_mismatches += 1
+                if self._batch_mismatches >= MAX_BATCH_MISMATCHES:
+                    self.batch_payloads = False
+            if self.batch_payloads:
+                logger.info("Endpoint did not answer a batch of %d, sending it one by one", len(batch))
+            else:
+                logger.warning("Endpoint did not answer %d batches in a row, turning batching off",
+                               MAX_BATCH_MISMATCHES)
+            self._send_pipelined(batch)
+            return
+        with self._lock:
+            self._batch_mismatches = 0
+        for (_, future), response in zip(batch, responses):
+            future.set_result(response)
+
+    def close(self):
+        """Stop the dispatcher once the queued requests are sent."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+
+def batching_predictor(endpoint_name, region_name=None, cache_path=ENDPOINT_CACHE_PATH, **kwargs):
+    """Return a BatchingPredictor over get_predictor(endpoint_name); kwargs go to BatchingPredictor."""
+    return BatchingPredictor(get_predictor(endpoint_name, region_name, cache_path), **kwargs)
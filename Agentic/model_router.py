@@ -0,0 +1,271 @@
+"""Pick the Bedrock model for each Converse request from a tier list.
+
+Tiers are ordered from cheapest/fastest to most capable. A request goes to
+the first tier that fits it: the prompt is within the tier's routing limit,
+the tier supports tools if the request has a toolConfig, and the predicted
+latency and cost are within the router's budgets. Latency predictions start
+from each tier's expected latency and follow observed latencies (EWMA).
+A throttled tier is put on a short cooldown and the request falls back to
+the nearest cheaper tier that can take it (or the next more capable one).
+The router's limiter backs off per model, so a throttled tier does not
+hold up the fallback to another.
+
+    client = routed_client(latency_budget_ms=3000)
+    response = client.converse(messages=messages, system=system)  # modelId chosen by the router
+    response["routing"]  # {"modelId": ..., "fallbacks": 0}
+
+Requests that name a model are passed through; use modelId="auto" (or leave
+it out) to route. additionalModelRequestFields are model specific, so a
+routed request's top_k is rewritten into the chosen model family's field
+and fields the family does not take are dropped.
+"""
+import logging
+import threading
+import time
+
+from bedrock_clients import DEFAULT_REGION, get_model_client
+from rate_limit import estimate_request_tokens, is_throttling_error, limiter_from_env
+
+logger = logging.getLogger(__name__)
+
+ROUTE_AUTO = "auto"
+EWMA_ALPHA = 0.2
+THROTTLE_COOLDOWN = 10.0
+# The router falls back quickly instead of letting the rate limiter retry a throttled tier;
+# its limiter backs off only the throttled model, so the fallback call does not wait.
+ROUTED_THROTTLE_ATTEMPTS = 2
+# Where each model family takes top_k in additionalModelRequestFields.
+TOP_K_FIELDS = {
+    "anthropic": ("top_k",),
+    "amazon": ("inferenceConfig", "topK"),
+    "meta": None,
+}
+# Cross-region inference profile prefixes ("us.amazon.nova-micro-v1:0").
+PROFILE_PREFIXES = {"us", "eu", "apac", "global"}
+
+
+def model_family(model_id):
+    """Provider part of a model id: "anthropic", "amazon", "meta", ..."""
+    parts = model_id.split(".")
+    if parts[0] in PROFILE_PREFIXES and len(parts) > 1:
+        parts = parts[1:]
+    return parts[0]
+
+
+def _top_k(fields):
+    """top_k from additionalModelRequestFields in any family's shape, or None."""
+    for path in TOP_K_FIELDS.values():
+        value = fields
+        for key in path or ():
+            value = value.get(key) if isinstance(value, dict) else None
+        if path and value is not None:
+            return value
+    return None
+
+
+class ModelTier:
+    """One routable model with its limits, capabilities and price (USD per 1K tokens)."""
+
+    def __init__(self, model_id, input_cost, output_cost, max_prompt_tokens,
+                 context_tokens, supports_tools=True, expected_latency_ms=1000.0):
+        """
+        Args:
+            model_id (str): Bedrock model id
+            input_cost (float): price per 1K input tokens
+            output_cost (float): price per 1K output tokens
+            max_prompt_tokens (int): largest prompt routed here by preference
+            context_tokens (int): hard limit; longer prompts never go here
+            supports_tools (bool): whether the model can take a toolConfig
+            expected_latency_ms (float): latency guess until calls are observed
+        """
+        self.model_id = model_id
+        self.input_cost = input_cost
+        self.output_cost = output_cost
+        self.max_prompt_tokens = max_prompt_tokens
+        self.context_tokens = context_tokens
+        self.supports_tools = supports_tools
+        self.expected_latency_ms = expected_latency_ms
+        self.family = model_family(model_id)
+
+    def prepare_request(self, request):
+        """
+        Return request for this model: its modelId, and additionalModelRequestFields
+        reduced to top_k in this family's shape (other fields are model specific
+        and dropped).
+        """
+        request = dict(request, modelId=self.model_id)
+        fields = request.pop("additionalModelRequestFields", None)
+        if not fields:
+            return request
+        top_k = _top_k(fields)
+        path = TOP_K_FIELDS.get(self.family)
+        if top_k is not None and path:
+            adapted = {path[-1]: top_k}
+            for key in reversed(path[:-1]):
+                adapted = {key: adapted}
+            request["additionalModelRequestFields"] = adapted
+        dropped = set(fields) - {top_k_path[0] for top_k_path in TOP_K_FIELDS.values() if top_k_path}
+        if dropped:
+            logger.debug("Dropped additionalModelRequestFields %s for %s", sorted(dropped), self.model_id)
+        return request
+
+    def estimate_cost(self, input_tokens, output_tokens):
+        return input_tokens / 1000 * self.input_cost + output_tokens / 1000 * self.output_cost
+
+
+# On-demand prices in us-east-1; adjust to your account and models.
+DEFAULT_TIERS = [
+    ModelTier("us.amazon.nova-micro-v1:0", 0.000035, 0.00014, 2000, 128000, expected_latency_ms=600),
+    ModelTier("anthropic.claude-3-haiku-20240307-v1:0", 0.00025, 0.00125, 8000, 200000, expected_latency_ms=1200),
+    ModelTier("anthropic.claude-3-sonnet-20240229-v1:0", 0.003, 0.015, 200000, 200000, expected_latency_ms=4000),
+]
+
+
+class ModelRouter:
+    """Choose a tier per request and learn per-model latency and throttling online."""
+
+    def __init__(self, tiers=None, latency_budget_ms=None, cost_budget=None):
+        """
+        Args:
+            tiers (list): ModelTier list, cheapest/fastest first
+            latency_budget_ms (float): skip tiers predicted to be slower than this
+            cost_budget (float): skip tiers whose estimated request cost (USD) is higher
+        """
+        self.tiers = list(tiers or DEFAULT_TIERS)
+        self.latency_budget_ms = latency_budget_ms
+        self.cost_budget = cost_budget
+        self._latency_ms = {tier.model_id: tier.expected_latency_ms for tier in self.tiers}
+        self._cooldown_until = {}
+        self._lock = threading.Lock()
+
+    def predicted_latency_ms(self, model_id):
+        return self._latency_ms[model_id]
+
+    def _fits(self, tier, input_tokens, needs_tools):
+        return input_tokens <= tier.context_tokens and (tier.supports_tools or not needs_tools)
+
+    def _available(self, tier, now):
+        return self._cooldown_until.get(tier.model_id, 0.0) <= now
+
+    def _within_budget(self, tier, input_tokens, output_tokens):
+        if self.latency_budget_ms is not None and self.predicted_latency_ms(tier.model_id) > self.latency_budget_ms:
+            return False
+        if self.cost_budget is not None and tier.estimate_cost(input_tokens, output_tokens) > self.cost_budget:
+            return False
+        return True
+
+    def route(self, request, exclude=()):
+        """
+        Return the ModelTier for a converse request.
+
+        Args:
+            request (dict): converse parameters (messages, system, toolConfig, inferenceConfig)
+            exclude (iterable): model ids not to pick (e.g. ones that just failed)
+        """
+        input_tokens = estimate_request_tokens(request) - request.get("inferenceConfig", {}).get("maxTokens", 512)
+        output_tokens = request.get("inferenceConfig", {}).get("maxTokens", 512)
+        needs_tools = bool(request.get("toolConfig"))
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                tier for tier in self.tiers
+                if tier.model_id not in exclude and self._fits(tier, input_tokens, needs_tools)
+            ]
+            if not candidates:
+                raise ValueError("No model tier can take this request")
+            available = [tier for tier in candidates if self._available(tier, now)] or candidates
+
+            # Preferred: the first tier meant for prompts of this size, within budget
+            for tier in available:
+                if input_tokens <= tier.max_prompt_tokens and self._within_budget(tier, input_tokens, output_tokens):
+                    return tier
+            # Nothing fits the budgets: take the fastest (predicted) tier that can run it
+            within_cost = [
+                tier for tier in available
+                if self.cost_budget is None or tier.estimate_cost(input_tokens, output_tokens) <= self.cost_budget
+            ]
+            return min(within_cost or available, key=lambda tier: self._latency_ms[tier.model_id])
+
+    def fallback(self, request, failed_model_id, tried=()):
+        """
+        Tier to use after failed_model_id was throttled: the nearest cheaper tier
+        that can take the request, else the nearest more capable one, else None.
+        """
+        input_tokens = estimate_request_tokens(request) - request.get("inferenceConfig", {}).get("maxTokens", 512)
+        needs_tools = bool(request.get("toolConfig"))
+        index = next(i for i, tier in enumerate(self.tiers) if tier.model_id == failed_model_id)
+        now = time.monotonic()
+        order = list(reversed(self.tiers[:index])) + self.tiers[index + 1:]
+        with self._lock:
+            for tier in order:
+                if tier.model_id in tried or not self._fits(tier, input_tokens, needs_tools):
+                    continue
+                if self._available(tier, now):
+                    return tier
+        return None
+
+    def record_latency(self, model_id, latency_ms):
+        """Fold an observed call latency into the model's EWMA."""
+        with self._lock:
+            if model_id in self._latency_ms:
+                previous = self._latency_ms[model_id]
+                self._latency_ms[model_id] = previous + EWMA_ALPHA * (latency_ms - previous)
+
+    def record_throttle(self, model_id, cooldown=THROTTLE_COOLDOWN):
+        """Route around model_id for cooldown seconds."""
+        with self._lock:
+            self._cooldown_until[model_id] = time.monotonic() + cooldown
+
+
+class RoutedClient:
+    """
+    Wrap a Bedrock Runtime client so converse/converse_stream requests without a
+    model (or with modelId="auto") are routed, with fallback on throttling.
+    Every other attribute is passed through to the wrapped client.
+    """
+
+    def __init__(self, client, router):
+        self._client = client
+        self.router = router
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _call(self, operation, **request):
+        if request.get("modelId", ROUTE_AUTO) != ROUTE_AUTO:
+            return getattr(self._client, operation)(**request)
+
+        tier = self.router.route(request)
+        tried = []
+        while True:
+            tried.append(tier.model_id)
+            start = time.perf_counter()
+            try:
+                response = getattr(self._client, operation)(**tier.prepare_request(request))
+            except Exception as e:
+                if not is_throttling_error(e):
+                    raise
+                self.router.record_throttle(tier.model_id)
+                next_tier = self.router.fallback(request, tier.model_id, tried)
+                if next_tier is None:
+                    raise
+                logger.warning("%s throttled, falling back to %s", tier.model_id, next_tier.model_id)
+                tier = next_tier
+                continue
+            # For streams this is the time to the start of the response.
+            self.router.record_latency(tier.model_id, (time.perf_counter() - start) * 1000)
+            response["routing"] = {"modelId": tier.model_id, "fallbacks": len(tried) - 1}
+            return response
+
+    def converse(self, **request):
+        return self._call("converse", **request)
+
+    def converse_stream(self, **request):
+        return self._call("converse_stream", **request)
+
+
+def routed_client(region_name=DEFAULT_REGION, tiers=None, latency_budget_ms=None, cost_budget=None, **kwargs):
+    """Return the shared model client behind a ModelRouter, with its own per-model backoff limiter."""
+    kwargs.setdefault("limiter", limiter_from_env(per_model_backoff=True))
+    client = get_model_client(region_name, throttle_attempts=ROUTED_THROTTLE_ATTEMPTS, **kwargs)
+    return RoutedClient(client, ModelRouter(tiers, latency_budget_ms, cost_budget))
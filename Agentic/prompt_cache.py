@@ -0,0 +1,65 @@
+"""Bedrock prompt caching (cachePoint) for Converse requests.
+
+Every agent turn re-sends the same system prompt, tool specs and an
+ever-growing conversation prefix. with_cache_points() marks those static
+parts with cache checkpoints so supporting models read them from the prompt
+cache instead of re-processing them:
+
+    1. after the system prompt
+    2. after the tool specs
+    3. after the stable conversation prefix (everything before the newest message)
+"""
+import os
+
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+# Model id fragments of models that accept cachePoint blocks.
+PROMPT_CACHE_MODELS = (
+    "anthropic.claude-3-5-haiku",
+    "anthropic.claude-3-7-sonnet",
+    "anthropic.claude-sonnet-4",
+    "anthropic.claude-opus-4",
+    "amazon.nova-micro",
+    "amazon.nova-lite",
+    "amazon.nova-pro",
+)
+
+
+def supports_prompt_caching(model_id):
+    """True if the model accepts cachePoint blocks; BEDROCK_PROMPT_CACHING=0/1 overrides."""
+    override = os.getenv("BEDROCK_PROMPT_CACHING")
+    if override is not None:
+        return override == "1"
+    return any(fragment in model_id for fragment in PROMPT_CACHE_MODELS)
+
+
+def with_cache_points(system, tool_config, messages):
+    """
+    Return copies of (system, tool_config, messages) with cache checkpoints added.
+
+    The caller's lists are not modified, so the conversation history stays
+    free of cachePoint blocks and checkpoints do not pile up turn after turn.
+    """
+    system = list(system or []) + [CACHE_POINT]
+    if tool_config:
+        tool_config = dict(tool_config, tools=list(tool_config["tools"]) + [CACHE_POINT])
+
+    messages = list(messages)
+    if len(messages) >= 2:
+        prefix_end = dict(messages[-2])
+        prefix_end["content"] = list(prefix_end["content"]) + [CACHE_POINT]
+        messages[-2] = prefix_end
+    return system, tool_config, messages
+
+
+def cache_usage(response):
+    """Return (cache read tokens, cache write tokens) from a Converse response."""
+    usage = response.get("usage", {})
+    return usage.get("cacheReadInputTokens", 0), usage.get("cacheWriteInputTokens", 0)
+
+
+def print_cache_usage(response):
+    """Print prompt cache token counts from a Converse response."""
+    read_tokens, write_tokens = cache_usage(response)
+    print(f"Cache read tokens: {read_tokens}")
+    print(f"Cache write tokens: {write_tokens}")
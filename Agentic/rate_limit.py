@@ -0,0 +1,288 @@
+"""Client-side rate limiting and throttling-aware retries for Bedrock.
+
+RateLimiter keeps two token buckets per model, one for requests per minute
+and one for (estimated) tokens per minute, and a process-wide backoff. When
+any call is throttled, the whole process pauses for a jittered exponential
+delay and that model's bucket rates are cut (AIMD). They then creep back
+towards the configured quota on each success, so throughput settles just
+under the real quota instead of thrashing against it.
+
+Configure the default limiter with BEDROCK_RPM and BEDROCK_TPM, or per model
+with RateLimiter.set_limits(). A limiter built with per_model_backoff=True
+backs off only the throttled model, for callers (like the model router)
+that move on to another model instead of waiting.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+# Server faults and dropped connections, retried like botocore's standard mode did
+# before the limiter took over retries (they do not slow the process down).
+TRANSIENT_ERROR_CODES = {"InternalServerException", "InternalFailure", "ServiceException"}
+TRANSIENT_MAX_ATTEMPTS = 3
+
+DEFAULT_MAX_ATTEMPTS = 6
+BASE_DELAY = 0.5
+MAX_DELAY = 30.0
+
+
+def is_throttling_error(error):
+    """True for errors that mean 'slow down', as opposed to a bad request."""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+    return type(error).__name__ in THROTTLING_ERROR_CODES
+
+
+def is_transient_error(error):
+    """True for server-side faults and connection errors worth retrying as they are."""
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code")
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in TRANSIENT_ERROR_CODES or (status >= 500 and code not in THROTTLING_ERROR_CODES)
+    # EndpointConnectionError/ConnectTimeoutError, ConnectionClosedError/ReadTimeoutError
+    return isinstance(error, (ConnectionError, HTTPClientError))
+
+
+def transient_backoff(attempt):
+    """Full-jitter exponential delay before retry number `attempt` of a transient error."""
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; rate is in tokens per second."""
+
+    def __init__(self, rate, capacity=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or rate * 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Block until amount tokens are available, then take them."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount):
+        """Charge (positive) or refund (negative) tokens after the fact."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def decrease(self, factor=0.7):
+        with self._lock:
+            self.rate = max(self.max_rate * 0.05, self.rate * factor)
+
+    def increase(self, step=0.02):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * step)
+
+
+class RateLimiter:
+    """Per-model request/token buckets plus a process-wide (or per-model) throttling backoff."""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, per_model_backoff=False):
+        self.default_limits = (requests_per_minute, tokens_per_minute)
+        self.per_model_backoff = per_model_backoff
+        self._limits = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        # Keyed by model id with per_model_backoff, else everything shares the None key.
+        self._backoff_until = {}
+        self._consecutive_throttles = {}
+
+    def _backoff_key(self, model_id):
+        return model_id if self.per_model_backoff else None
+
+    def set_limits(self, model_id, requests_per_minute=None, tokens_per_minute=None):
+        """Set the quota of one model (None for unlimited)."""
+        with self._lock:
+            self._limits[model_id] = (requests_per_minute, tokens_per_minute)
+            self._buckets.pop(model_id, None)
+
+    def _get_buckets(self, model_id):
+        with self._lock:
+            buckets = self._buckets.get(model_id)
+            if buckets is None:
+                rpm, tpm = self._limits.get(model_id, self.default_limits)
+                buckets = (
+                    TokenBucket(rpm / 60) if rpm else None,
+                    TokenBucket(tpm / 60) if tpm else None,
+                )
+                self._buckets[model_id] = buckets
+            return buckets
+
+    def wait_for_backoff(self, model_id=None):
+        """Sleep while the process (or model_id, with per_model_backoff) is backing off after a throttle."""
+        delay = self._backoff_until.get(self._backoff_key(model_id), 0.0) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def acquire(self, model_id, estimated_tokens=0):
+        """Wait for backoff and for request/token capacity of model_id."""
+        self.wait_for_backoff(model_id)
+        request_bucket, token_bucket = self._get_buckets(model_id)
+        if request_bucket:
+            request_bucket.acquire(1)
+        if token_bucket and estimated_tokens:
+            token_bucket.acquire(estimated_tokens)
+
+    def record_success(self, model_id, estimated_tokens=0, actual_tokens=None):
+        """Reset the backoff, raise the model's rates a step and settle the token estimate."""
+        with self._lock:
+            self._consecutive_throttles.pop(self._backoff_key(model_id), None)
+        for bucket in self._get_buckets(model_id):
+            if bucket:
+                bucket.increase()
+        token_bucket = self._get_buckets(model_id)[1]
+        if token_bucket and actual_tokens is not None:
+            token_bucket.adjust(actual_tokens - estimated_tokens)
+
+    def record_throttle(self, model_id):
+        """Back the process (or just this model) off and cut the model's rates. Returns the delay."""
+        with self._lock:
+            key = self._backoff_key(model_id)
+            throttles = self._consecutive_throttles[key] = self._consecutive_throttles.get(key, 0) + 1
+            ceiling = min(MAX_DELAY, BASE_DELAY * 2 ** (throttles - 1))
+            delay = random.uniform(ceiling / 2, ceiling)
+            self._backoff_until[key] = max(self._backoff_until.get(key, 0.0), time.monotonic() + delay)
+        for bucket in self._get_buckets(model_id):
+            if bucket:
+                bucket.decrease()
+        return delay
+
+
+def estimate_request_tokens(request):
+    """Estimate the tokens a request will use: its input (~4 chars/token) plus maxTokens."""
+    size = 0
+    for key in ("messages", "system", "toolConfig", "body"):
+        value = request.get(key)
+        if value is not None:
+            size += len(value) if isinstance(value, (str, bytes)) else len(json.dumps(value, default=str))
+    max_tokens = request.get("inferenceConfig", {}).get("maxTokens", 512)
+    return size // 4 + max_tokens
+
+
+class RateLimitedClient:
+    """
+    Wrap a Bedrock Runtime client so model calls go through a RateLimiter and
+    throttled calls are retried with jittered exponential backoff. Transient
+    server and connection errors are retried too (up to TRANSIENT_MAX_ATTEMPTS
+    tries), without backing the whole process off. Every other attribute is
+    passed through to the wrapped client.
+    """
+
+    def __init__(self, client, limiter, max_attempts=DEFAULT_MAX_ATTEMPTS, on_retry=None):
+        """
+        Args:
+            client: Bedrock Runtime client
+            limiter (RateLimiter): limiter the calls go through
+            max_attempts (int): tries per call, counting the first
+            on_retry (callable): called with (operation, model id) before each retry
+        """
+        self._client = client
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.on_retry = on_retry
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _call(self, operation, **request):
+        model_id = request.get("modelId")
+        estimated_tokens = estimate_request_tokens(request)
+        transient_failures = 0
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire(model_id, estimated_tokens)
+            try:
+                response = getattr(self._client, operation)(**request)
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    raise
+                if is_throttling_error(e):
+                    delay = self.limiter.record_throttle(model_id)
+                    logger.warning("%s throttled on %s (attempt %d/%d), backing off %.1fs",
+                                   operation, model_id, attempt, self.max_attempts, delay)
+                elif is_transient_error(e) and transient_failures + 1 < TRANSIENT_MAX_ATTEMPTS:
+                    transient_failures += 1
+                    delay = transient_backoff(transient_failures)
+                    logger.warning("%s on %s failed with %s (attempt %d/%d), retrying in %.1fs",
+                                   operation, model_id, type(e).__name__, attempt, self.max_attempts, delay)
+                    time.sleep(delay)
+                else:
+                    raise
+                if self.on_retry:
+                    self.on_retry(operation, model_id)
+                continue
+            actual_tokens = response.get("usage", {}).get("totalTokens") if isinstance(response, dict) else None
+            self.limiter.record_success(model_id, estimated_tokens, actual_tokens)
+            return response
+
+    def converse(self, **request):
+        return self._call("converse", **request)
+
+    def converse_stream(self, **request):
+        return self._call("converse_stream", **request)
+
+    def invoke_model(self, **request):
+        return self._call("invoke_model", **request)
+
+    def invoke_model_with_response_stream(self, **request):
+        return self._call("invoke_model_with_response_stream", **request)
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def limiter_from_env(per_model_backoff=False):
+    """Return a new limiter configured from BEDROCK_RPM / BEDROCK_TPM."""
+    rpm = os.getenv("BEDROCK_RPM")
+    tpm = os.getenv("BEDROCK_TPM")
+    return RateLimiter(
+        requests_per_minute=float(rpm) if rpm else None,
+        tokens_per_minute=float(tpm) if tpm else None,
+        per_model_backoff=per_model_backoff,
+    )
+
+
+def get_default_limiter():
+    """Return the process-wide limiter configured from BEDROCK_RPM / BEDROCK_TPM."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = limiter_from_env()
+    return _default_limiter
+
+
+def rate_limited(client, limiter=None, max_attempts=DEFAULT_MAX_ATTEMPTS, on_retry=None):
+    """Wrap a client with the (default) process-wide rate limiter."""
+    return RateLimitedClient(client, limiter or get_default_limiter(), max_attempts, on_retry)
@@ -0,0 +1,252 @@
+"""Opt-in, content-addressed cache for Converse and InvokeModel responses.
+
+Requests are keyed on a SHA-256 of their canonical JSON (modelId, messages,
+system, toolConfig, inferenceConfig, ...). Lookups go to an in-memory LRU
+first and then to an SQLite file with TTL and size-based eviction.
+
+Enable it for the scripts by pointing BEDROCK_CACHE_PATH at a cache file:
+
+    BEDROCK_CACHE_PATH=.bedrock-cache.sqlite python 03.Converse-Agentic-Tool.py
+
+BEDROCK_CACHE_TTL (seconds) and BEDROCK_CACHE_MAX_MB bound the disk tier;
+BEDROCK_CACHE_PATH=:memory: keeps only the in-memory tier.
+"""
+import atexit
+import copy
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Request fields that never change the model output.
+_IGNORED_FIELDS = ("requestMetadata",)
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def request_key(operation, request):
+    """Return the cache key for a request: sha256 of its canonical JSON."""
+    request = {k: v for k, v in request.items() if k not in _IGNORED_FIELDS}
+    body = request.get("body")
+    if isinstance(body, (str, bytes)):
+        # Native InvokeModel bodies: canonicalize the JSON inside the string.
+        try:
+            request["body"] = json.loads(body)
+        except ValueError:
+            request["body"] = body.decode("utf-8", "replace") if isinstance(body, bytes) else body
+    return hashlib.sha256(_canonical([operation, request]).encode("utf-8")).hexdigest()
+
+
+def is_deterministic(request):
+    """
+    True when the request asks for greedy decoding (an explicit temperature of 0).
+    An unset temperature is not: the models' defaults sample (e.g. 1.0 for Claude).
+    """
+    temperature = request.get("inferenceConfig", {}).get("temperature")
+    body = request.get("body")
+    if temperature is None and isinstance(body, (str, bytes)):
+        try:
+            temperature = json.loads(body).get("temperature")
+        except (ValueError, AttributeError):
+            pass
+    return temperature == 0
+
+
+class ResponseCache:
+    """Two-tier response cache: in-memory LRU in front of an optional SQLite file."""
+
+    def __init__(self, path=None, memory_size=256, ttl=None, max_bytes=None):
+        """
+        Args:
+            path (str): SQLite file for the disk tier (None for memory only)
+            memory_size (int): entries kept in the in-memory LRU
+            ttl (float): seconds an entry stays valid (None for no expiry)
+            max_bytes (int): size bound of the disk tier (None for unbounded)
+        """
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, "
+                "accessed REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key):
+        """Return the cached value for key, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store a JSON-serializable value under key in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                data = json.dumps(value, separators=(",", ":"), default=str)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, data, now, now, len(data)),
+                )
+                self._evict(now)
+
+    def _remember(self, key, created, value):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        if self.max_bytes is not None:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Drop least recently used entries until back under the bound.
+                excess = total - self.max_bytes
+                for key, size in self._db.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed"
+                ).fetchall():
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+
+    def stats(self):
+        """Hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class CachingClient:
+    """
+    Wrap a Bedrock Runtime client so converse() and invoke_model() go through a cache.
+
+    Every other attribute is passed through to the wrapped client. Pass
+    use_cache=False to a single call to bypass the cache; with
+    cache_nondeterministic=False, requests with a non-zero temperature
+    always go to the model.
+    """
+
+    def __init__(self, client, cache, cache_nondeterministic=True):
+        self._client = client
+        self.cache = cache
+        self.cache_nondeterministic = cache_nondeterministic
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _should_cache(self, request, use_cache):
+        return use_cache and (self.cache_nondeterministic or is_deterministic(request))
+
+    def converse(self, use_cache=True, **request):
+        if not self._should_cache(request, use_cache):
+            return self._client.converse(**request)
+        key = request_key("converse", request)
+        response = self.cache.get(key)
+        if response is None:
+            response = self._client.converse(**request)
+            response = {k: v for k, v in response.items() if k != "ResponseMetadata"}
+            self.cache.put(key, response)
+        # Callers append the message to their conversation; never hand out the cached object.
+        return copy.deepcopy(response)
+
+    def invoke_model(self, use_cache=True, **request):
+        if not self._should_cache(request, use_cache):
+            return self._client.invoke_model(**request)
+        key = request_key("invoke_model", request)
+        cached = self.cache.get(key)
+        if cached is None:
+            response = self._client.invoke_model(**request)
+            cached = {
+                "body": response["body"].read().decode("utf-8"),
+                "contentType": response.get("contentType"),
+            }
+            self.cache.put(key, cached)
+        return {
+            "body": io.BytesIO(cached["body"].encode("utf-8")),
+            "contentType": cached["contentType"],
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Return the process-wide cache configured from BEDROCK_CACHE_* (None when disabled)."""
+    global _default_cache
+    path = os.getenv("BEDROCK_CACHE_PATH")
+    if not path:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            ttl = os.getenv("BEDROCK_CACHE_TTL")
+            max_mb = os.getenv("BEDROCK_CACHE_MAX_MB")
+            _default_cache = ResponseCache(
+                path=None if path == ":memory:" else path,
+                ttl=float(ttl) if ttl else None,
+                max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+            )
+            atexit.register(lambda: print(f"Response cache: {_default_cache.stats()}"))
+    return _default_cache
+
+
+def maybe_cached(client, cache_nondeterministic=None):
+    """Wrap client in a CachingClient when the cache is enabled, else return it as is.
+
+    Set BEDROCK_CACHE_NONDETERMINISTIC=0 to send temperature > 0 requests to the model.
+    """
+    cache = get_default_cache()
+    if cache is None:
+        return client
+    if cache_nondeterministic is None:
+        cache_nondeterministic = os.getenv("BEDROCK_CACHE_NONDETERMINISTIC", "1") != "0"
+    return CachingClient(client, cache, cache_nondeterministic)
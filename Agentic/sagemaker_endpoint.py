@@ -0,0 +1,161 @@
+"""Lightweight SageMaker endpoint calls without the sagemaker SDK on the hot path.
+
+retrieve_default() imports the whole sagemaker SDK and asks the control
+plane about the endpoint (and its JumpStart model) before the first request
+is sent. The predictor it returns only needs three things to call the
+endpoint: its name, the request content type and the response accept type.
+resolve_endpoint() works those out once, with the SDK imported only then,
+and caches them on disk; later runs read the cache and call
+invoke_endpoint directly on the shared sagemaker-runtime client.
+
+    predictor = get_predictor("jumpstart-dft-deepseek-llm-r1-disti-20250401-105354")
+    response = predictor.predict({"messages": [...], "max_tokens": 128})
+
+SAGEMAKER_ENDPOINT_CACHE sets the cache file (default
+~/.cache/sagemaker-endpoints.json) and SAGEMAKER_ENDPOINT_CACHE_TTL how long
+an entry is trusted, in seconds (default one day).
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from bedrock_clients import DEFAULT_REGION, get_client, get_session
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT_CACHE_PATH = os.getenv(
+    "SAGEMAKER_ENDPOINT_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "sagemaker-endpoints.json")
+)
+ENDPOINT_CACHE_TTL = float(os.getenv("SAGEMAKER_ENDPOINT_CACHE_TTL", "86400"))
+# What the JumpStart text generation predictors send and accept.
+DEFAULT_CONTENT_TYPE = "application/json"
+DEFAULT_ACCEPT = "application/json"
+
+_cache_lock = threading.Lock()
+
+
+def _region(region_name):
+    return region_name or get_session().region_name or DEFAULT_REGION
+
+
+def _load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_cache(path, cache):
+    # Written to a temporary file and renamed, so a reader never sees half a file.
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, staging = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(staging, path)
+
+
+def _describe_with_sdk(endpoint_name, region_name):
+    """Resolve the endpoint's content types the way retrieve_default() does (slow)."""
+    try:
+        import boto3
+        from sagemaker.predictor import retrieve_default
+        from sagemaker.session import Session
+    except ImportError:
+        logger.info("sagemaker is not installed, using JSON for endpoint %s", endpoint_name)
+        return {"content_type": DEFAULT_CONTENT_TYPE, "accept": DEFAULT_ACCEPT}
+
+    session = Session(boto_session=boto3.Session(region_name=region_name))
+    predictor = retrieve_default(endpoint_name, sagemaker_session=session)
+    accept = predictor.deserializer.ACCEPT
+    if isinstance(accept, (list, tuple)):
+        accept = accept[0]
+    return {"content_type": predictor.serializer.CONTENT_TYPE, "accept": accept}
+
+
+def resolve_endpoint(endpoint_name, region_name=None, cache_path=ENDPOINT_CACHE_PATH, refresh=False):
+    """
+    Return the endpoint's invocation metadata, from the disk cache when possible.
+
+    Args:
+        endpoint_name (str): SageMaker endpoint name
+        region_name (str): AWS region (default: the session's region)
+        cache_path (str): cache file, or None to always resolve
+        refresh (bool): ignore a cached entry and resolve again
+
+    Returns:
+        dict: {"endpoint_name", "region", "content_type", "accept", "resolved_at"}
+    """
+    region_name = _region(region_name)
+    key = f"{region_name}/{endpoint_name}"
+    if cache_path and not refresh:
+        entry = _load_cache(cache_path).get(key)
+        if entry and time.time() - entry["resolved_at"] < ENDPOINT_CACHE_TTL:
+            return entry
+
+    start = time.perf_counter()
+    entry = dict(_describe_with_sdk(endpoint_name, region_name),
+                 endpoint_name=endpoint_name, region=region_name, resolved_at=time.time())
+    logger.info("Resolved endpoint %s in %.0f ms", endpoint_name, (time.perf_counter() - start) * 1000)
+    if cache_path:
+        with _cache_lock:
+            cache = _load_cache(cache_path)
+            cache[key] = entry
+            _save_cache(cache_path, cache)
+    return entry
+
+
+def forget_endpoint(endpoint_name, region_name=None, cache_path=ENDPOINT_CACHE_PATH):
+    """Drop an endpoint from the disk cache, e.g. after it was redeployed."""
+    key = f"{_region(region_name)}/{endpoint_name}"
+    with _cache_lock:
+        cache = _load_cache(cache_path)
+        if cache.pop(key, None) is not None:
+            _save_cache(cache_path, cache)
+
+
+class EndpointPredictor:
+    """A JSON predictor that calls invoke_endpoint on the shared sagemaker-runtime client."""
+
+    def __init__(self, endpoint, client, cache_path=ENDPOINT_CACHE_PATH):
+        """
+        Args:
+            endpoint (dict): metadata from resolve_endpoint()
+            client: sagemaker-runtime client
+            cache_path (str): cache the metadata came from (dropped if the call is rejected)
+        """
+        self.endpoint = endpoint
+        self.endpoint_name = endpoint["endpoint_name"]
+        self.client = client
+        self.cache_path = cache_path
+
+    def predict(self, payload):
+        """Send payload as JSON and return the decoded response."""
+        try:
+            response = self.client.invoke_endpoint(
+                EndpointName=self.endpoint_name,
+                ContentType=self.endpoint["content_type"],
+                Accept=self.endpoint["accept"],
+                Body=json.dumps(payload),
+            )
+        except ClientError as e:
+            # A deleted or redeployed endpoint invalidates what was cached about it. A list
+            # payload (a micro_batch probe) may just be a shape the container rejects.
+            if (self.cache_path and not isinstance(payload, list)
+                    and e.response.get("Error", {}).get("Code") == "ValidationError"):
+                forget_endpoint(self.endpoint_name, self.endpoint["region"], self.cache_path)
+            raise
+        body = response["Body"].read()
+        return json.loads(body) if body else None
+
+
+def get_predictor(endpoint_name, region_name=None, cache_path=ENDPOINT_CACHE_PATH, refresh=False):
+    """Return an EndpointPredictor for endpoint_name (see resolve_endpoint)."""
+    endpoint = resolve_endpoint(endpoint_name, region_name, cache_path, refresh)
+    client = get_client("sagemaker-runtime", region_name=endpoint["region"])
+    return EndpointPredictor(endpoint, client, cache_path)
@@ -0,0 +1,264 @@
+"""Run generated Lambda code locally, in a resource-limited subprocess.
+
+Each run gets a fresh `python -I` process in a scratch directory with an
+empty environment (no AWS credentials), rlimits on CPU time, address space,
+file size and open files, and a wall-clock timeout. The handler is imported
+from lambda_function.py and called with the sample event and a fake context,
+like the Lambda runtime would. A small thread pool caps how many sandboxes
+run at once.
+
+Code runs under the Lambda runtime's Python (python3.12 on PATH, or
+LAMBDA_SANDBOX_PYTHON), since dependencies are built as Lambda (cp312,
+manylinux x86_64) wheels. Without dependencies the current interpreter is
+used if no such Python is found.
+
+    result = run_handler(code, {"numbers": [1, 2, 3]})
+    # {"ok": True, "result": ..., "stdout": "...", "duration_ms": 31.2}
+"""
+import functools
+import json
+import os
+import platform
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_MEMORY_MB = 512
+DEFAULT_CPU_SECONDS = 5
+MAX_OUTPUT_CHARS = 4000
+MAX_WORKERS = 4
+
+# Runs inside the sandbox: imports the handler, calls it and writes the
+# outcome as JSON to the original stdout; the handler's prints are captured.
+RUNNER = r'''
+import contextlib, io, json, sys, time, traceback
+
+class Context:
+    function_name = "local-sandbox"
+    function_version = "$LATEST"
+    invoked_function_arn = "arn:aws:lambda:local:000000000000:function:local-sandbox"
+    memory_limit_in_mb = int(sys.argv[3])
+    aws_request_id = "00000000-0000-0000-0000-000000000000"
+    log_group_name = "/aws/lambda/local-sandbox"
+    log_stream_name = "local"
+
+    def __init__(self, deadline):
+        self._deadline = deadline
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.time()) * 1000))
+
+out = sys.stdout
+captured = io.StringIO()
+outcome = {}
+start = time.perf_counter()
+try:
+    with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+        sys.path.insert(0, ".")
+        module = __import__("lambda_function")
+        handler = getattr(module, sys.argv[1])
+        event = json.loads(sys.stdin.read())
+        result = handler(event, Context(time.time() + float(sys.argv[2])))
+    json.dumps(result)
+    outcome = {"ok": True, "result": result}
+except BaseException as e:
+    outcome = {"ok": False, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+outcome["stdout"] = captured.getvalue()
+outcome["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+out.write(json.dumps(outcome, default=str))
+'''
+
+
+@functools.lru_cache(maxsize=None)
+def find_lambda_python():
+    """
+    Path of an interpreter matching the Lambda runtime's Python version, or None.
+
+    LAMBDA_SANDBOX_PYTHON overrides the lookup of python<version> on PATH.
+    """
+    from utils import LAMBDA_PYTHON_VERSION
+
+    if "%d.%d" % sys.version_info[:2] == LAMBDA_PYTHON_VERSION:
+        return sys.executable
+    candidate = os.getenv("LAMBDA_SANDBOX_PYTHON") or shutil.which(f"python{LAMBDA_PYTHON_VERSION}")
+    if not candidate:
+        return None
+    # Resolves wrappers (e.g. pyenv shims) to the real interpreter, which runs with an empty environment.
+    try:
+        completed = subprocess.run(
+            [candidate, "-c", "import sys; print('%d.%d' % sys.version_info[:2]); print(sys.executable)"],
+            capture_output=True, text=True, timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    lines = completed.stdout.split()
+    if completed.returncode != 0 or len(lines) != 2 or lines[0] != LAMBDA_PYTHON_VERSION:
+        return None
+    return lines[1]
+
+
+def _limits_prelude(memory_mb, cpu_seconds):
+    """
+    Code run first inside the sandbox to apply its rlimits (POSIX only).
+
+    The limits are set by the sandboxed interpreter itself rather than in a
+    preexec_fn, which is not safe in a threaded parent (run_handler_pooled).
+    Children of the handler inherit them.
+    """
+    if os.name != "posix":
+        return ""
+    memory = memory_mb * 1024 * 1024
+    file_size = 16 * 1024 * 1024
+    return (
+        "import resource\n"
+        f"resource.setrlimit(resource.RLIMIT_AS, ({memory}, {memory}))\n"
+        f"resource.setrlimit(resource.RLIMIT_CPU, ({cpu_seconds}, {cpu_seconds}))\n"
+        f"resource.setrlimit(resource.RLIMIT_FSIZE, ({file_size}, {file_size}))\n"
+        "resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))\n"
+        "resource.setrlimit(resource.RLIMIT_CORE, (0, 0))\n"
+    )
+
+
+def _kill_group(process):
+    """Kill the sandbox's process group, including anything the handler started."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _truncate(text):
+    if len(text) <= MAX_OUTPUT_CHARS:
+        return text
+    return text[:MAX_OUTPUT_CHARS] + f"\n... ({len(text) - MAX_OUTPUT_CHARS} more characters)"
+
+
+def run_handler(code, event=None, handler="handler", dependencies=None,
+                timeout=DEFAULT_TIMEOUT, memory_mb=DEFAULT_MEMORY_MB, cpu_seconds=DEFAULT_CPU_SECONDS):
+    """
+    Import lambda_function.py from code and call handler(event, context) in a sandbox.
+
+    Args:
+        code (str): the lambda_function.py source
+        event (dict): sample event passed to the handler
+        handler (str): name of the handler function
+        dependencies (list): requirements made importable (built with
+            utils.build_dependencies, so they are cached like deployments)
+        timeout (float): wall-clock limit in seconds
+        memory_mb (int): address space limit of the process
+        cpu_seconds (int): CPU time limit
+
+    Returns:
+        dict: {"ok": True, "result": ...} or {"ok": False, "error": ..., "traceback": ...},
+        both with the handler's captured "stdout" and "duration_ms"
+    """
+    # Fail fast on syntax errors without starting a process.
+    try:
+        compile(code, "lambda_function.py", "exec")
+    except SyntaxError as e:
+        return {"ok": False, "error": f"SyntaxError: {e}", "traceback": "", "stdout": "", "duration_ms": 0.0}
+
+    python = find_lambda_python()
+    if dependencies:
+        import utils
+
+        # The wheels are built for the Lambda runtime and only import under a matching interpreter.
+        error = None
+        if python is None:
+            error = (f"Dependencies are built for the Lambda runtime (Python {utils.LAMBDA_PYTHON_VERSION}); "
+                     f"install python{utils.LAMBDA_PYTHON_VERSION} or set LAMBDA_SANDBOX_PYTHON")
+        elif platform.machine() not in ("x86_64", "AMD64"):
+            error = f"Dependencies are built for {utils.LAMBDA_PLATFORM} and cannot run on {platform.machine()}"
+        if error:
+            return {"ok": False, "error": error, "traceback": "", "stdout": "", "duration_ms": 0.0}
+
+    # No credentials or other settings leak in from the parent environment.
+    env = {"PATH": os.defpath, "LANG": "C.UTF-8", "PYTHONDONTWRITEBYTECODE": "1"}
+    dependency_path = []
+    if dependencies:
+        dependency_path.append(utils.build_dependencies(dependencies))
+
+    with tempfile.TemporaryDirectory(prefix="lambda-sandbox-") as workdir:
+        with open(os.path.join(workdir, "lambda_function.py"), "w") as f:
+            f.write(code)
+        # -I (isolated mode) ignores PYTHONPATH, so dependencies are put on sys.path by the runner
+        command = [python or sys.executable, "-I", "-c",
+                   _limits_prelude(memory_mb, cpu_seconds)
+                   + f"import sys; sys.path[:0] = {dependency_path!r}\n" + RUNNER,
+                   handler, str(timeout), str(memory_mb)]
+        start = time.perf_counter()
+        # A new session puts the sandbox in its own process group, so the
+        # handler's own subprocesses can be killed with it.
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            cwd=workdir,
+            env=env,
+            start_new_session=os.name == "posix",
+        )
+        try:
+            stdout, stderr = process.communicate(json.dumps(event if event is not None else {}), timeout=timeout)
+        except subprocess.TimeoutExpired:
+            if os.name == "posix":
+                _kill_group(process)
+            else:
+                process.kill()
+            stdout, _ = process.communicate()
+            return {
+                "ok": False,
+                "error": f"Timed out after {timeout:g}s",
+                "traceback": "",
+                "stdout": _truncate(stdout or ""),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+        finally:
+            # Background processes left by the handler do not outlive the run.
+            if os.name == "posix":
+                _kill_group(process)
+
+    try:
+        outcome = json.loads(stdout)
+    except ValueError:
+        # The process died before reporting (e.g. killed by the CPU limit or out of memory).
+        if process.returncode < 0:
+            error = f"Sandbox killed by signal {-process.returncode} (CPU or memory limit)"
+        else:
+            error = f"Sandbox exited with code {process.returncode}"
+        outcome = {
+            "ok": False,
+            "error": error,
+            "traceback": stderr,
+            "stdout": stdout,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+    outcome["stdout"] = _truncate(outcome["stdout"])
+    if "traceback" in outcome:
+        outcome["traceback"] = _truncate(outcome["traceback"])
+    return outcome
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_sandbox_executor():
+    """Thread pool that bounds how many sandboxes run at once."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="sandbox")
+    return _executor
+
+
+def run_handler_pooled(code, event=None, **kwargs):
+    """run_handler() on the shared sandbox pool; blocks until the run finishes."""
+    return get_sandbox_executor().submit(run_handler, code, event, **kwargs).result()
@@ -0,0 +1,187 @@
+"""Persistent Converse conversations: an append-only log per session plus an index.
+
+Each session's messages are appended as JSON lines to their own log file
+(sessions/<2-char shard>/<session id>.jsonl). A SQLite index (WAL mode)
+records each session and, per message, its byte offset, length, estimated
+tokens and whether it starts a turn. Looking a session up is one indexed
+query, and resuming reads only the byte range of the messages needed, so
+neither the other sessions nor the older part of a long log are touched.
+
+    store = SessionStore(".sessions")
+    session_id = store.create()
+    store.append(session_id, {"role": "user", "content": [{"text": "Hi"}]})
+    messages = store.load_tail(session_id, max_tokens=8000)  # resume
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from history import estimate_tokens, is_turn_start
+
+DEFAULT_PATH = os.getenv("BEDROCK_SESSION_PATH", ".sessions")
+
+
+class SessionNotFoundError(KeyError):
+    """Raised for a session id that is not in the store."""
+
+
+class SessionStore:
+    """Append-only per-session message logs with a SQLite index."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.join(path, "sessions"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, created REAL, updated REAL,"
+            " message_count INTEGER, metadata TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT, seq INTEGER, offset INTEGER, length INTEGER,"
+            " tokens INTEGER, turn_start INTEGER, PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+
+    def _log_path(self, session_id):
+        # Sharded directories keep tens of thousands of logs fast to open.
+        shard = session_id[:2] if len(session_id) >= 2 else "_"
+        return os.path.join(self.path, "sessions", shard, f"{session_id}.jsonl")
+
+    def _query(self, sql, params):
+        # One connection is shared by all threads; queries take the same lock as writes.
+        with self._lock:
+            return self._query_locked(sql, params)
+
+    def _query_locked(self, sql, params):
+        return self._db.execute(sql, params).fetchall()
+
+    def _session_row(self, session_id, query=None):
+        rows = (query or self._query)(
+            "SELECT message_count, metadata FROM sessions WHERE session_id = ?", (session_id,)
+        )
+        if not rows:
+            raise SessionNotFoundError(session_id)
+        return rows[0]
+
+    def create(self, session_id=None, metadata=None):
+        """Create a session and return its id (a new uuid unless one is given)."""
+        session_id = session_id or uuid.uuid4().hex
+        if "/" in session_id or os.sep in session_id or session_id.startswith("."):
+            raise ValueError(f"Invalid session id '{session_id}'")
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, 0, ?)",
+                (session_id, now, now, json.dumps(metadata or {})),
+            )
+        os.makedirs(os.path.dirname(self._log_path(session_id)), exist_ok=True)
+        return session_id
+
+    def exists(self, session_id):
+        return bool(self._query("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)))
+
+    def metadata(self, session_id):
+        return json.loads(self._session_row(session_id)[1])
+
+    def message_count(self, session_id):
+        return self._session_row(session_id)[0]
+
+    def append(self, session_id, *messages):
+        """Append messages to a session's log and index them."""
+        lines = [json.dumps(message, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+                 for message in messages]
+        with self._lock:
+            count = self._session_row(session_id, self._query_locked)[0]
+            # The log is written (and flushed) before the index, so the index
+            # never points at bytes that are not on disk. Bytes left by a crash
+            # between the two are never referenced.
+            with open(self._log_path(session_id), "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                rows = []
+                for seq, (message, line) in enumerate(zip(messages, lines), count):
+                    rows.append((session_id, seq, offset, len(line), estimate_tokens(message),
+                                 int(is_turn_start(message))))
+                    offset += len(line)
+                f.write(b"".join(lines))
+                f.flush()
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute(
+                "UPDATE sessions SET message_count = ?, updated = ? WHERE session_id = ?",
+                (count + len(messages), time.time(), session_id),
+            )
+            self._db.execute("COMMIT")
+
+    def _read(self, session_id, start_seq):
+        """Read messages from start_seq to the end with a single read of their byte range."""
+        rows = self._query(
+            "SELECT offset, length FROM messages WHERE session_id = ? AND seq >= ? ORDER BY seq",
+            (session_id, start_seq),
+        )
+        if not rows:
+            return []
+        base = rows[0][0]
+        with open(self._log_path(session_id), "rb") as f:
+            f.seek(base)
+            data = f.read(rows[-1][0] + rows[-1][1] - base)
+        return [json.loads(data[offset - base:offset - base + length]) for offset, length in rows]
+
+    def load(self, session_id, last=None):
+        """Return the session's messages, or only the last `last` of them."""
+        count = self._session_row(session_id)[0]
+        start = max(0, count - last) if last is not None else 0
+        return self._read(session_id, start)
+
+    def load_tail(self, session_id, max_tokens):
+        """
+        Return the most recent whole turns that fit in max_tokens (at least the
+        last turn), reading only those messages from the log.
+        """
+        self._session_row(session_id)
+        total = 0
+        start = None
+        with self._lock:
+            # Walk the index backwards and stop at the budget; older rows are never read.
+            rows = self._db.execute(
+                "SELECT seq, tokens, turn_start FROM messages WHERE session_id = ? ORDER BY seq DESC",
+                (session_id,),
+            )
+            for seq, tokens, turn_start in rows:
+                total += tokens
+                if total > max_tokens and start is not None:
+                    break
+                if turn_start:
+                    start = seq
+            rows.close()
+        if start is None:
+            start = 0
+        return self._read(session_id, start)
+
+    def list_sessions(self, limit=100, offset=0):
+        """Most recently updated sessions as (session_id, message_count, updated)."""
+        return self._query(
+            "SELECT session_id, message_count, updated FROM sessions ORDER BY updated DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+
+    def delete(self, session_id):
+        with self._lock:
+            self._session_row(session_id, self._query_locked)
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._db.execute("COMMIT")
+            try:
+                os.remove(self._log_path(session_id))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,199 @@
+"""Streaming Converse calls.
+
+stream_converse() calls converse_stream, prints text deltas as they arrive,
+assembles toolUse input JSON from its fragments, and hands every toolUse
+block to a callback the moment the block closes, so tools can start while
+the model is still generating. It returns a dict shaped like a converse()
+response, with time-to-first-token and total latency added to "metrics".
+
+stream_invoke_model() does the same for invoke_model_with_response_stream
+with the models' native request formats (Anthropic Messages and Meta Llama).
+"""
+import json
+import sys
+import time
+
+
+def print_text_delta(text):
+    """Default text handler: write the delta straight to stdout."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def stream_converse(client, on_text=print_text_delta, on_tool_use=None, **request):
+    """
+    Call converse_stream and assemble the streamed message.
+
+    Args:
+        client: Bedrock Runtime client
+        on_text (callable): called with each text delta (None to stay quiet)
+        on_tool_use (callable): called with each complete toolUse dict as soon
+            as its content block closes
+        **request: converse_stream parameters (modelId, messages, system, ...)
+
+    Returns:
+        dict: {"output": {"message": ...}, "stopReason", "usage", "metrics"}
+        where metrics has timeToFirstTokenMs and totalMs measured client-side
+    """
+    start = time.perf_counter()
+    first_token_at = None
+    response = client.converse_stream(**request)
+
+    role = "assistant"
+    blocks = {}
+    stop_reason = None
+    usage = {}
+    metrics = {}
+
+    for event in response["stream"]:
+        if "messageStart" in event:
+            role = event["messageStart"]["role"]
+
+        elif "contentBlockStart" in event:
+            index = event["contentBlockStart"]["contentBlockIndex"]
+            tool_use = event["contentBlockStart"]["start"].get("toolUse")
+            if tool_use:
+                blocks[index] = {"toolUse": dict(tool_use), "input_parts": []}
+
+        elif "contentBlockDelta" in event:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            index = event["contentBlockDelta"]["contentBlockIndex"]
+            delta = event["contentBlockDelta"]["delta"]
+            if "text" in delta:
+                block = blocks.setdefault(index, {"text_parts": []})
+                block["text_parts"].append(delta["text"])
+                if on_text:
+                    on_text(delta["text"])
+            elif "toolUse" in delta:
+                blocks[index]["input_parts"].append(delta["toolUse"]["input"])
+
+        elif "contentBlockStop" in event:
+            index = event["contentBlockStop"]["contentBlockIndex"]
+            block = blocks.get(index)
+            if block and "toolUse" in block:
+                raw_input = "".join(block.pop("input_parts"))
+                block["toolUse"]["input"] = json.loads(raw_input) if raw_input else {}
+                if on_tool_use:
+                    on_tool_use(block["toolUse"])
+
+        elif "messageStop" in event:
+            stop_reason = event["messageStop"]["stopReason"]
+
+        elif "metadata" in event:
+            usage = event["metadata"].get("usage", {})
+            metrics = dict(event["metadata"].get("metrics", {}))
+
+    end = time.perf_counter()
+    if on_text:
+        on_text("\n")
+
+    content = []
+    for index in sorted(blocks):
+        block = blocks[index]
+        if "toolUse" in block:
+            content.append({"toolUse": block["toolUse"]})
+        else:
+            content.append({"text": "".join(block["text_parts"])})
+
+    metrics["timeToFirstTokenMs"] = round(((first_token_at or end) - start) * 1000, 1)
+    metrics["totalMs"] = round((end - start) * 1000, 1)
+    return {
+        "output": {"message": {"role": role, "content": content}},
+        "stopReason": stop_reason,
+        "usage": usage,
+        "metrics": metrics,
+    }
+
+
+def decode_native_chunk(chunk):
+    """
+    Decode one native streaming chunk (Anthropic Messages or Meta Llama format).
+
+    Returns:
+        tuple: (text delta or "", stop reason or None, dict of token counts seen in the chunk)
+    """
+    usage = {}
+    metrics = chunk.get("amazon-bedrock-invocationMetrics")
+    if metrics:
+        usage = {"inputTokens": metrics.get("inputTokenCount"), "outputTokens": metrics.get("outputTokenCount")}
+
+    chunk_type = chunk.get("type")
+    if chunk_type is not None:
+        # Anthropic: message_start, content_block_*, message_delta, message_stop
+        if chunk_type == "content_block_delta":
+            return chunk["delta"].get("text", ""), None, usage
+        if chunk_type == "message_start":
+            input_tokens = chunk["message"].get("usage", {}).get("input_tokens")
+            if input_tokens is not None:
+                usage.setdefault("inputTokens", input_tokens)
+        elif chunk_type == "message_delta":
+            output_tokens = chunk.get("usage", {}).get("output_tokens")
+            if output_tokens is not None:
+                usage.setdefault("outputTokens", output_tokens)
+            return "", chunk["delta"].get("stop_reason"), usage
+        return "", None, usage
+
+    # Llama: {"generation", "prompt_token_count", "generation_token_count", "stop_reason"}
+    if chunk.get("prompt_token_count") is not None:
+        usage.setdefault("inputTokens", chunk["prompt_token_count"])
+    if chunk.get("generation_token_count") is not None:
+        usage.setdefault("outputTokens", chunk["generation_token_count"])
+    return chunk.get("generation") or "", chunk.get("stop_reason"), usage
+
+
+def stream_invoke_model(client, model_id, body, on_text=print_text_delta):
+    """
+    Call invoke_model_with_response_stream and decode the native chunks as they arrive.
+
+    Args:
+        client: Bedrock Runtime client
+        model_id (str): model to invoke
+        body (dict or str): native request body
+        on_text (callable): called with each text delta (None to stay quiet)
+
+    Returns:
+        dict: {"text", "stopReason", "usage", "metrics"} where metrics has
+        timeToFirstTokenMs and totalMs measured client-side
+    """
+    if not isinstance(body, (str, bytes)):
+        body = json.dumps(body)
+    start = time.perf_counter()
+    first_token_at = None
+    response = client.invoke_model_with_response_stream(modelId=model_id, body=body)
+
+    parts = []
+    stop_reason = None
+    usage = {}
+    for event in response["body"]:
+        if "chunk" not in event:
+            continue
+        text, chunk_stop_reason, chunk_usage = decode_native_chunk(json.loads(event["chunk"]["bytes"]))
+        usage.update({key: value for key, value in chunk_usage.items() if value is not None})
+        stop_reason = chunk_stop_reason or stop_reason
+        if text:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(text)
+            if on_text:
+                on_text(text)
+
+    end = time.perf_counter()
+    if on_text:
+        on_text("\n")
+    return {
+        "text": "".join(parts),
+        "stopReason": stop_reason,
+        "usage": usage,
+        "metrics": {
+            "timeToFirstTokenMs": round(((first_token_at or end) - start) * 1000, 1),
+            "totalMs": round((end - start) * 1000, 1),
+        },
+    }
+
+
+def print_stream_timing(response):
+    """Print the client-side latency numbers of a streamed turn."""
+    metrics = response["metrics"]
+    print(f"Time to first token: {metrics['timeToFirstTokenMs']} ms, "
+          f"total: {metrics['totalMs']} ms")
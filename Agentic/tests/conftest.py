@@ -0,0 +1,34 @@
+"""Shared fixtures: the Agentic modules are imported flat, and model calls go to the local stub."""
+import os
+import sys
+
+import pytest
+
+AGENTIC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AGENTIC_DIR)
+
+from bedrock_stub import start_stub_server  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    """A fresh Bedrock/SageMaker stub; yields (server, endpoint url)."""
+    server, url = start_stub_server()
+    yield server, url
+    server.shutdown()
+
+
+@pytest.fixture
+def stub_env(stub, monkeypatch):
+    """Environment pointing boto3 at the stub with dummy credentials; returns the env dict."""
+    _, url = stub
+    env = {
+        "AWS_ENDPOINT_URL_BEDROCK_RUNTIME": url,
+        "AWS_ENDPOINT_URL_SAGEMAKER_RUNTIME": url,
+        "AWS_ACCESS_KEY_ID": "stub",
+        "AWS_SECRET_ACCESS_KEY": "stub",
+        "AWS_DEFAULT_REGION": "us-east-1",
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return dict(os.environ, **env)
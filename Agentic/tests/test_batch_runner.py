@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import AGENTIC_DIR
+
+INPUT = "\n".join([
+    '{"id": "a", "prompt": "hi"}',
+    '{not json',
+    '{"id": "b"}',
+    '[1, 2]',
+    '{"id": "c", "prompt": "hello"}',
+]) + "\n"
+
+
+def run_batch(env, input_path, output_path):
+    return subprocess.run(
+        [sys.executable, os.path.join(AGENTIC_DIR, "batch_runner.py"), input_path, output_path],
+        cwd=AGENTIC_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_malformed_lines_get_one_record_across_resumes(stub_env, tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    output_path = tmp_path / "out.jsonl"
+    input_path.write_text(INPUT)
+
+    for _ in range(3):
+        run_batch(stub_env, str(input_path), str(output_path))
+        records = read_records(output_path)
+        ids = [record["id"] for record in records]
+        assert sorted(ids) == ["2", "4", "a", "b", "c"]
+        statuses = {record["id"]: record["status"] for record in records}
+        assert statuses == {"a": "ok", "c": "ok", "2": "invalid", "b": "invalid", "4": "invalid"}
+
+
+def test_failed_items_are_rerun_and_replaced(stub_env, tmp_path):
+    from batch_runner import read_finished_ids
+
+    output_path = tmp_path / "out.jsonl"
+    output_path.write_text(
+        '{"id": "a", "status": "error", "error": "throttled"}\n'
+        '{"id": "b", "status": "ok"}\n'
+        '{"id": "c", "status": "invalid"}\n'
+        '{"id": "d", "stat'
+    )
+    assert read_finished_ids(str(output_path)) == {"b", "c"}
+    assert [record["id"] for record in read_records(output_path)] == ["b", "c"]
@@ -0,0 +1,69 @@
+import pytest
+
+import hedging
+from bedrock_clients import clear_clients, get_model_client
+from bedrock_stub import start_stub_server
+from hedging import HedgedClient
+from rate_limit import RateLimiter
+
+MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+MESSAGES = [{"role": "user", "content": [{"text": "hi"}]}]
+
+
+@pytest.fixture
+def second_stub():
+    server, url = start_stub_server()
+    yield server, url
+    server.shutdown()
+
+
+def region_client(region_name, url):
+    """A model client like hedged_client builds, pointed at one stub."""
+    return get_model_client(region_name, throttle_attempts=1, limiter=RateLimiter(), hedge=False, endpoint_url=url)
+
+
+def test_bedrock_regions_turns_on_hedging(stub_env, monkeypatch):
+    clear_clients()
+    monkeypatch.setenv("BEDROCK_REGIONS", "us-east-1,us-west-2")
+    client = get_model_client()
+    assert isinstance(client, HedgedClient)
+    assert get_model_client() is client
+    response = client.converse(modelId=MODEL_ID, messages=MESSAGES)
+    assert response["region"] in ("us-east-1", "us-west-2")
+
+    monkeypatch.setenv("BEDROCK_REGIONS", "us-east-1")
+    assert not isinstance(get_model_client(), HedgedClient)
+    clear_clients()
+
+
+def test_slow_call_is_hedged_to_another_region(stub_env, monkeypatch, second_stub):
+    monkeypatch.setattr(hedging, "INITIAL_HEDGE_DELAY_MS", 100.0)
+    slow, slow_url = start_stub_server(latency=2.0)
+    try:
+        client = HedgedClient(
+            {"us-east-1": region_client("us-east-1", slow_url), "us-west-2": region_client("us-west-2", second_stub[1])},
+            weights={"us-east-1": 1.0, "us-west-2": 1e-9},
+        )
+        response = client.converse(modelId=MODEL_ID, messages=MESSAGES)
+        assert response["region"] == "us-west-2"
+        assert client.stats["hedged"] == 1
+        assert client.stats["hedge_wins"] == 1
+        client.close()
+    finally:
+        slow.shutdown()
+
+
+def test_throttled_region_shifts_traffic(stub_env, second_stub):
+    throttled, throttled_url = start_stub_server(throttle_rate=1.0)
+    try:
+        client = HedgedClient({
+            "us-east-1": region_client("us-east-1", throttled_url),
+            "us-west-2": region_client("us-west-2", second_stub[1]),
+        })
+        regions = [client.converse(modelId=MODEL_ID, messages=MESSAGES)["region"] for _ in range(10)]
+        assert regions == ["us-west-2"] * 10
+        # After its first throttle the region cools down and gets no more primary traffic.
+        assert throttled.backend.snapshot().get("requests", 0) <= 1
+        client.close()
+    finally:
+        throttled.shutdown()
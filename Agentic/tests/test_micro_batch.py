@@ -0,0 +1,65 @@
+import threading
+
+from botocore.exceptions import ClientError
+
+from micro_batch import MAX_BATCH_MISMATCHES, BatchingPredictor
+
+
+class ListRejectingPredictor:
+    """Answers single payloads; rejects list payloads like a container that cannot batch."""
+
+    def __init__(self):
+        self.batches = 0
+
+    def predict(self, payload):
+        if isinstance(payload, list):
+            self.batches += 1
+            raise ClientError({"Error": {"Code": "ValidationError", "Message": "bad shape"}}, "InvokeEndpoint")
+        return {"echo": payload}
+
+
+def send_batch(predictor, size=4):
+    """Submit size payloads before the dispatcher collects them, so they form one batch."""
+    predictor.max_wait_ms = 200
+    return predictor.predict_many(list(range(size)))
+
+
+def test_rejected_batch_is_resent_without_turning_batching_off():
+    inner = ListRejectingPredictor()
+    predictor = BatchingPredictor(inner)
+    assert send_batch(predictor) == [{"echo": i} for i in range(4)]
+    assert inner.batches == 1
+    assert predictor.batch_payloads
+    predictor.close()
+
+
+def test_batching_turns_off_after_repeated_rejections():
+    inner = ListRejectingPredictor()
+    predictor = BatchingPredictor(inner)
+    for _ in range(MAX_BATCH_MISMATCHES):
+        assert send_batch(predictor) == [{"echo": i} for i in range(4)]
+    assert not predictor.batch_payloads
+    send_batch(predictor)
+    assert inner.batches == MAX_BATCH_MISMATCHES
+    predictor.close()
+
+
+def test_submit_racing_close_is_answered_or_rejected():
+    predictor = BatchingPredictor(ListRejectingPredictor())
+    futures, rejected = [], []
+
+    def submit_many():
+        for i in range(200):
+            try:
+                futures.append(predictor.submit(i))
+            except RuntimeError:
+                rejected.append(i)
+
+    thread = threading.Thread(target=submit_many)
+    thread.start()
+    predictor.close()
+    thread.join()
+    # Every accepted request was sent before the dispatcher stopped.
+    assert all(future.done() for future in futures)
+    assert len(futures) + len(rejected) == 200
+    predictor.close()
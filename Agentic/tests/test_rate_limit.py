@@ -0,0 +1,24 @@
+import time
+
+from rate_limit import RateLimiter
+
+
+def timed_acquire(limiter, model_id):
+    start = time.monotonic()
+    limiter.acquire(model_id, 10)
+    return time.monotonic() - start
+
+
+def test_throttle_backs_off_every_model_by_default():
+    limiter = RateLimiter()
+    for _ in range(3):
+        limiter.record_throttle("model-a")
+    assert timed_acquire(limiter, "model-b") > 0.4
+
+
+def test_per_model_backoff_leaves_other_models_alone():
+    limiter = RateLimiter(per_model_backoff=True)
+    for _ in range(3):
+        limiter.record_throttle("model-a")
+    assert timed_acquire(limiter, "model-b") < 0.1
+    assert timed_acquire(limiter, "model-a") > 0.4
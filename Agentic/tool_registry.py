@@ -0,0 +1,211 @@
+"""Registry for the tools offered to the model through the Converse API.
+
+Tools are declared once with the @registry.tool decorator. At registration
+their JSON input schema is compiled into a validator and the toolSpec is
+added to a toolConfig payload that is built once and reused on every call.
+Dispatch is a dict lookup, and bad inputs are rejected before the tool runs.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ToolInputError(ValueError):
+    """Raised when a tool input does not match the tool's input schema."""
+
+
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def compile_schema(schema, path="input"):
+    """
+    Compile a JSON schema into a validator function.
+
+    Supports the subset used by tool input schemas: type, properties,
+    required, additionalProperties (false), items, enum, minItems/maxItems.
+    The returned function raises ToolInputError on the first violation.
+    """
+    checks = []
+
+    expected_type = schema.get("type")
+    if expected_type is not None:
+        types = expected_type if isinstance(expected_type, list) else [expected_type]
+        type_checks = [_TYPE_CHECKS[t] for t in types]
+
+        def check_type(value, path):
+            if not any(check(value) for check in type_checks):
+                raise ToolInputError(f"{path}: expected {expected_type}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(value, path):
+            if value not in allowed:
+                raise ToolInputError(f"{path}: {value!r} is not one of {allowed}")
+        checks.append(check_enum)
+
+    properties = {
+        name: compile_schema(sub_schema)
+        for name, sub_schema in schema.get("properties", {}).items()
+    }
+    required = schema.get("required", [])
+    closed = schema.get("additionalProperties") is False
+    if properties or required or closed:
+        def check_object(value, path):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    raise ToolInputError(f"{path}: missing required property '{name}'")
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is not None:
+                    validator(item, f"{path}.{name}")
+                elif closed:
+                    raise ToolInputError(f"{path}: unexpected property '{name}'")
+        checks.append(check_object)
+
+    if "items" in schema or "minItems" in schema or "maxItems" in schema:
+        item_validator = compile_schema(schema["items"]) if "items" in schema else None
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+
+        def check_array(value, path):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                raise ToolInputError(f"{path}: expected at least {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                raise ToolInputError(f"{path}: expected at most {max_items} items")
+            if item_validator is not None:
+                for index, item in enumerate(value):
+                    item_validator(item, f"{path}[{index}]")
+        checks.append(check_array)
+
+    def validate(value, path=path):
+        for check in checks:
+            check(value, path)
+
+    return validate
+
+
+class Tool:
+    """A registered tool: its spec, compiled validator and handler."""
+
+    def __init__(self, name, description, input_schema, handler, context=()):
+        self.name = name
+        self.description = description
+        self.input_schema = input_schema
+        self.handler = handler
+        self.context = tuple(context)
+        self.validate = compile_schema(input_schema)
+        self.spec = {
+            "toolSpec": {
+                "name": name,
+                "description": description,
+                "inputSchema": {"json": input_schema},
+            }
+        }
+
+
+class ToolRegistry:
+    """Tools offered to the model, keyed by name."""
+
+    def __init__(self):
+        self._tools = {}
+        self._tool_config = None
+
+    def register(self, name, description, input_schema, handler, context=()):
+        """
+        Register a tool.
+
+        Args:
+            name (str): tool name the model will use
+            description (str): tool description sent to the model
+            input_schema (dict): JSON schema of the tool input
+            handler (callable): called with the tool input as keyword arguments
+            context (tuple): names of extra keyword arguments (e.g. clients)
+                that dispatch() passes through to the handler
+        """
+        self._tools[name] = Tool(name, description, input_schema, handler, context)
+        self._tool_config = None
+        return handler
+
+    def tool(self, name=None, description=None, input_schema=None, context=()):
+        """Decorator form of register(); name and description default to the function's."""
+        def decorator(handler):
+            return self.register(
+                name or handler.__name__,
+                description or (handler.__doc__ or "").strip().splitlines()[0],
+                input_schema or {"type": "object", "properties": {}},
+                handler,
+                context,
+            )
+        return decorator
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def get(self, name):
+        return self._tools[name]
+
+    @property
+    def tool_list(self):
+        """The toolSpec list, in registration order."""
+        return self.tool_config["tools"]
+
+    @property
+    def tool_config(self):
+        """The Converse toolConfig payload, built once and reused."""
+        if self._tool_config is None:
+            self._tool_config = {"tools": [tool.spec for tool in self._tools.values()]}
+        return self._tool_config
+
+    def validate(self, name, tool_input):
+        """Check a tool input against the tool's compiled schema."""
+        tool = self._tools.get(name)
+        if tool is None:
+            raise ToolInputError(f"Unknown tool '{name}'")
+        tool.validate(tool_input)
+        return tool
+
+    def dispatch(self, tool_use_block, **context):
+        """
+        Run the tool requested by a toolUse block.
+
+        Returns:
+            dict: a toolResult content block; invalid input or an unknown tool
+            gives an error toolResult so the model can correct itself
+        """
+        name = tool_use_block["name"]
+        tool_input = tool_use_block.get("input") or {}
+        try:
+            tool = self.validate(name, tool_input)
+        except ToolInputError as e:
+            logger.warning("Rejected input for tool %s: %s", name, e)
+            return {
+                "toolResult": {
+                    "toolUseId": tool_use_block["toolUseId"],
+                    "content": [{"text": f"Invalid input: {e}"}],
+                    "status": "error",
+                }
+            }
+
+        kwargs = dict(tool_input)
+        kwargs.update({key: context[key] for key in tool.context})
+        result = tool.handler(**kwargs)
+        return {
+            "toolResult": {
+                "toolUseId": tool_use_block["toolUseId"],
+                "content": [{"json": {"result": result}}],
+            }
+        }
@@ -1,8 +1,117 @@
+import base64
+import hashlib
+import io
 import os
+import pathlib
 import shutil
 import subprocess
+import sys
+import tempfile
 import zipfile
 
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+# Wheels are resolved for the Lambda runtime, not for the machine packaging them.
+LAMBDA_PYTHON_VERSION = "3.12"
+LAMBDA_PLATFORM = "manylinux2014_x86_64"
+DEPENDENCY_CACHE_DIR = os.getenv(
+    "LAMBDA_DEPENDENCY_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "lambda-dependencies")
+)
+
+# Every entry gets the same timestamp (the earliest a zip can hold), so the
+# archive bytes depend only on file names and contents.
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+# 0 stores entries uncompressed; 1-9 is the deflate level.
+DEFAULT_COMPRESSLEVEL = int(os.getenv("LAMBDA_ZIP_COMPRESSLEVEL", "6"))
+
+# Packages are stored under their content hash, so identical packages share one object.
+ARTIFACT_PREFIX = "lambda_resources/sha256"
+LAYER_ARTIFACT_PREFIX = "lambda_layers/sha256"
+LAYER_NAME_PREFIX = "psd-deps-"
+# Large packages (dependency layers) go up as parallel 8 MB parts.
+ARTIFACT_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True,
+)
+
+
+def build_zip(files, compresslevel=DEFAULT_COMPRESSLEVEL, output=None):
+    """
+    Build a deterministic zip archive.
+
+    Args:
+        files (iterable): (archive name, content) pairs; content is bytes/str,
+            or a pathlib.Path of a file on disk
+        compresslevel (int): 0 to store, 1-9 for deflate
+        output: writable binary file to stream the archive to (e.g. an open
+            file or upload buffer); when omitted the archive is built in memory
+
+    Returns:
+        bytes: the archive, or None when written to output
+    """
+    buffer = output if output is not None else io.BytesIO()
+    compression = zipfile.ZIP_DEFLATED if compresslevel else zipfile.ZIP_STORED
+    with zipfile.ZipFile(buffer, "w", compression, compresslevel=compresslevel or None) as zipf:
+        # Entries are written in name order with fixed metadata, so the same
+        # inputs always produce byte-identical archives.
+        for name, source in sorted(files, key=lambda item: item[0]):
+            info = zipfile.ZipInfo(name, date_time=ZIP_TIMESTAMP)
+            info.compress_type = compression
+            info.create_system = 3
+            if isinstance(source, os.PathLike):
+                executable = os.stat(source).st_mode & 0o111
+                info.external_attr = (0o755 if executable else 0o644) << 16
+                with open(source, "rb") as f:
+                    source = f.read()
+            else:
+                info.external_attr = 0o644 << 16
+            zipf.writestr(info, source, compresslevel=compresslevel or None)
+    if output is None:
+        return buffer.getvalue()
+    return None
+
+
+def iter_tree(directory):
+    """
+    Yield (archive name, pathlib.Path) for every file under directory.
+    """
+    directory = pathlib.Path(directory)
+    for path in directory.rglob("*"):
+        if path.is_file():
+            yield path.relative_to(directory).as_posix(), path
+
+
+def build_lambda_package(lambda_code, dependencies=None, compresslevel=DEFAULT_COMPRESSLEVEL):
+    """
+    Return the deployment package (lambda_function.py plus any dependencies) as zip bytes.
+    """
+    files = [("lambda_function.py", lambda_code)]
+    if dependencies:
+        files.extend(iter_tree(build_dependencies(dependencies)))
+    return build_zip(files, compresslevel)
+
+
+def layer_name(dependencies):
+    """
+    Name of the Lambda layer holding a dependency set (one layer per set).
+    """
+    return LAYER_NAME_PREFIX + requirements_hash(dependencies)
+
+
+def build_layer_package(dependencies, compresslevel=DEFAULT_COMPRESSLEVEL):
+    """
+    Return a Lambda layer zip of the dependencies (under python/, where the
+    runtime puts layers on sys.path) as bytes.
+    """
+    files = [
+        ("python/" + name, path)
+        for name, path in iter_tree(build_dependencies(dependencies))
+    ]
+    return build_zip(files, compresslevel)
+
 
 def create_deployment_package_no_dependencies(
     lambda_code, project_name, output_zip_name
@@ -10,23 +119,72 @@ def create_deployment_package_no_dependencies(
     """
     Create a deployment package without dependencies.
     """
-    # Create the project directory
-    os.makedirs(project_name, exist_ok=True)
+    with open(output_zip_name, "wb") as f:
+        f.write(build_lambda_package(lambda_code))
+    return output_zip_name
 
-    # Write the lambda code to the lambda_function.py file
-    with open(os.path.join(project_name, "lambda_function.py"), "w") as f:
-        f.write(lambda_code)
 
-    # Create a .zip file for the deployment package
-    with zipfile.ZipFile(output_zip_name, "w") as zipf:
-        zipf.write(
-            os.path.join(project_name, "lambda_function.py"), "lambda_function.py"
-        )
+def normalize_requirements(dependencies):
+    """
+    Return the requirement set as a sorted list without blanks or duplicates.
+    """
+    return sorted({dependency.strip() for dependency in dependencies if dependency.strip()}, key=str.lower)
 
-    # Clean up the project directory
-    shutil.rmtree(project_name)
 
-    return output_zip_name
+def requirements_hash(dependencies):
+    """
+    Hash of the sorted requirement set and the target platform, used as the cache key.
+    """
+    key = "\n".join([LAMBDA_PLATFORM, LAMBDA_PYTHON_VERSION] + normalize_requirements(dependencies))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def build_dependencies(dependencies, cache_dir=None):
+    """
+    Install the dependencies for the Lambda runtime and return the directory
+    holding them.
+
+    The whole set is resolved in a single pip run (so pip sees every
+    constraint at once) and the result is kept under a hash of the sorted
+    requirements; the same set is then reused without running pip. Only
+    binary wheels can be targeted at another platform, so packages that ship
+    only an sdist fail here rather than being built for the wrong machine.
+    """
+    requirements = normalize_requirements(dependencies)
+    cache_dir = cache_dir or DEPENDENCY_CACHE_DIR
+    target = os.path.join(cache_dir, requirements_hash(requirements))
+    if os.path.isdir(target):
+        return target
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Install next to the final location and rename it into place, so a
+    # failed or concurrent build never leaves a half-filled cache entry.
+    staging = tempfile.mkdtemp(prefix=".build-", dir=cache_dir)
+    try:
+        subprocess.run(
+            [
+                sys.executable, "-m", "pip", "install",
+                "--target", staging,
+                "--platform", LAMBDA_PLATFORM,
+                "--python-version", LAMBDA_PYTHON_VERSION,
+                "--implementation", "cp",
+                "--only-binary=:all:",
+                "--no-compile",
+                "--disable-pip-version-check",
+                "--quiet",
+                *requirements,
+            ],
+            check=True,
+        )
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another process built the same set first; use theirs.
+            if not os.path.isdir(target):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
 
 
 def create_deployment_package_with_dependencies(
@@ -35,38 +193,34 @@ def create_deployment_package_with_dependencies(
     """
     Create a deployment package with dependencies.
     """
-    # Create the project directory
-    os.makedirs(project_name, exist_ok=True)
-
-    # Write the lambda code to the lambda_function.py file
-    with open(os.path.join(project_name, "lambda_function.py"), "w") as f:
-        f.write(lambda_code)
-
-    # Install the dependencies to the package directory
-    package_dir = os.path.join(project_name, "package")
-    os.makedirs(package_dir, exist_ok=True)
-
-    # Turn dependencies into a list
-    # dependencies = dependencies.split(",")
-
-    for dependency in dependencies:
-        subprocess.run(["pip", "install", "--target", package_dir, dependency])
-
-    # Create a .zip file for the deployment package
-    with zipfile.ZipFile(output_zip_name, "w") as zipf:
-        # Add the installed dependencies to the .zip file
-        for root, _, files in os.walk(package_dir):
-            for file in files:
-                zipf.write(
-                    os.path.join(root, file),
-                    os.path.relpath(os.path.join(root, file), package_dir),
-                )
-        # Add the lambda_function.py file to the .zip file
-        zipf.write(
-            os.path.join(project_name, "lambda_function.py"), "lambda_function.py"
-        )
+    with open(output_zip_name, "wb") as f:
+        f.write(build_lambda_package(lambda_code, dependencies))
+    return output_zip_name
 
-    # Clean up the project directory
-    shutil.rmtree(project_name)
 
-    return output_zip_name
+def package_sha256(package):
+    """
+    Return the SHA-256 of a package as (hex digest, base64 digest).
+
+    The base64 form is what Lambda reports as CodeSha256.
+    """
+    digest = hashlib.sha256(package).digest()
+    return digest.hex(), base64.b64encode(digest).decode("ascii")
+
+
+def upload_artifact(s3, bucket, package, prefix=ARTIFACT_PREFIX):
+    """
+    Upload a package under its content hash unless that object already exists.
+
+    Returns:
+        tuple: (S3 key, True if it was uploaded / False if it was already there)
+    """
+    key = f"{prefix}/{package_sha256(package)[0]}.zip"
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return key, False
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+            raise
+    s3.upload_fileobj(io.BytesIO(package), bucket, key, Config=ARTIFACT_TRANSFER_CONFIG)
+    return key, True
@@ -1,29 +1,26 @@
 # wher is the code 
 
+import os
+import sys
+
 import boto3
 
+# The shared client registry lives next to the Agentic scripts.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Agentic"))
+from bedrock_clients import get_bedrock_client
+
 def create_bedrock_client(region_name="us-east-1"):
     """
-    Create an Amazon Bedrock runtime client.
+    Return the shared Amazon Bedrock runtime client.
     
     Args:
         region_name (str): AWS region name where Bedrock is available
         
     Returns:
-        boto3.client: Bedrock runtime client
+        boto3.client: Bedrock runtime client (pooled and reused process-wide)
     """
     print(boto3.__version__) 
-    # Create a session with AWS credentials
-    session = boto3.Session()
-   
-    
-    # Create the Bedrock runtime client
-    bedrock = session.client(
-        service_name='bedrock-runtime',
-        region_name=region_name
-    )
-    
-    return bedrock
+    return get_bedrock_client(region_name)
 
 # Example usage:
 if __name__ == "__main__":